@@ -1,7 +1,27 @@
 import pyray as pr
 from pyray import Vector3
+import numpy as np
 
 from tp1_functions import *
+from mesh_functions import (
+    InstancedMeshRenderer,
+    RenderMesh,
+    begin_overlay_passes,
+    create_gpu_model,
+    edges_to_triangles,
+    end_overlay_passes,
+)
+from raster_functions import draw_software_instances, draw_software_lines, software_mode_active
+
+# Grilles de draw_plane déjà envoyées au GPU, une par taille : taille -> ((axe x, y, z, taille), pr.Model)
+# Quand l'axe change, le modèle de cette taille est remplacé : le cache ne grossit pas en bougeant les curseurs
+plane_grid_cache = {}
+
+# Flèches unitaires déjà envoyées au GPU, une par proportion de tête : head_size_factor -> InstancedMeshRenderer
+arrow_renderers = {}
+
+# Nombre de côtés des cylindres d'une flèche (comme les pr.draw_cylinder_ex d'origine)
+ARROW_SIDES = 8
 
 def initialize_camera():
     """Initialise la caméra 3D."""
@@ -29,36 +49,116 @@ def update_camera_position(camera, movement_speed):
     if pr.is_key_down(pr.KEY_E):
         camera.position.y -= movement_speed
 
+def frustum_mesh_arrays(z_start, z_end, radius_start, radius_end, sides):
+    """Génère un tronc de cône fermé le long de l'axe z local (sommets, faces orientées vers l'extérieur)."""
+    angles = np.linspace(0, 2 * np.pi, sides, endpoint=False)
+    ring = np.column_stack((np.cos(angles), np.sin(angles)))
+    vertices = np.vstack((
+        np.column_stack((ring * radius_start, np.full(sides, z_start))),
+        np.column_stack((ring * radius_end, np.full(sides, z_end))),
+        [[0, 0, z_start], [0, 0, z_end]],
+    ))
+
+    bottom = np.arange(sides)
+    top = bottom + sides
+    next_bottom = (bottom + 1) % sides
+    next_top = next_bottom + sides
+    faces = np.vstack((
+        np.column_stack((bottom, next_bottom, next_top)),
+        np.column_stack((bottom, next_top, top)),
+        np.column_stack((np.full(sides, 2 * sides), next_bottom, bottom)),
+        np.column_stack((np.full(sides, 2 * sides + 1), top, next_top)),
+    ))
+    return vertices, faces
+
+def arrow_mesh_arrays(head_size_factor, sides=ARROW_SIDES):
+    """Génère la flèche unitaire : longueur 1 selon z, rayons exprimés en unités d'épaisseur."""
+    shaft_vertices, shaft_faces = frustum_mesh_arrays(0.0, 1.0, 0.5, 0.5, sides)
+    head_vertices, head_faces = frustum_mesh_arrays(head_size_factor, 1.0, 2.0, 0.2, sides)
+    return np.vstack((shaft_vertices, head_vertices)), np.vstack((shaft_faces, head_faces + len(shaft_vertices)))
+
+def arrow_renderer(head_size_factor):
+    """Retourne le rendu instancié de la flèche unitaire, créé au premier appel pour chaque proportion de tête."""
+    if head_size_factor not in arrow_renderers:
+        vertices, faces = arrow_mesh_arrays(head_size_factor)
+        arrow_renderers[head_size_factor] = InstancedMeshRenderer(RenderMesh.from_arrays(vertices, faces))
+    return arrow_renderers[head_size_factor]
+
+def arrow_transforms(starts, ends, thickness):
+    """Calcule les matrices (N,4,4) qui placent la flèche unitaire de chaque départ à chaque arrivée."""
+    starts = as_vector_array(starts)
+    directions = as_vector_array(ends) - starts
+    lengths = vector_lengths(directions)
+    n_directions = vectors_normalize(directions)
+
+    # Repère orthonormé direct (u, w, n) autour de chaque direction
+    reference = np.where(np.abs(n_directions[:, 1:2]) < 0.9, [[0.0, 1.0, 0.0]], [[1.0, 0.0, 0.0]])
+    u = vectors_normalize(cross_products(n_directions, reference))
+    w = cross_products(n_directions, u)
+
+    transforms = np.zeros((len(starts), 4, 4))
+    transforms[:, :3, 0] = u * thickness
+    transforms[:, :3, 1] = w * thickness
+    transforms[:, :3, 2] = n_directions * lengths[:, np.newaxis]
+    transforms[:, :3, 3] = starts
+    transforms[:, 3, 3] = 1.0
+    return transforms
+
+def draw_vectors_3(starts, ends, color, thickness=0.05, head_size_factor=0.8):
+    """Dessine un ensemble de vecteurs (N,3) en un seul lot instancié de flèches."""
+    if software_mode_active():
+        draw_software_instances(*arrow_mesh_arrays(head_size_factor), arrow_transforms(starts, ends, thickness), color)
+        return
+    renderer = arrow_renderer(head_size_factor)
+    renderer.draw(arrow_transforms(starts, ends, thickness), show_edges=False, show_vertices=False, face_color=color)
+
 def draw_vector_3(start, end, color, thickness=0.05, head_size_factor=0.8):
     """Dessine un vecteur en utilisant un cylindre et un cône."""
-    direction = Vector3(end.x - start.x, end.y - start.y, end.z - start.z)
-    length = vector_length(direction)
-    head_size = length * head_size_factor
-    
-    n_direction = vector_normalize(direction)
-    
-    arrow_start = Vector3(start.x + n_direction.x * head_size, 
-                          start.y + n_direction.y * head_size, 
-                          start.z + n_direction.z * head_size)
-    
-    pr.draw_cylinder_ex(start, end, thickness / 2, thickness / 2, 8, color)
-    pr.draw_cylinder_ex(arrow_start, end, thickness * 2, thickness / 5, 8, color)
+    draw_vectors_3(start, end, color, thickness, head_size_factor)
 
-def draw_plane(axis, size=5, color=pr.GRAY):
-    """Dessine un plan basé sur un vecteur normal et une taille."""
+def plane_grid_vertices(axis, size):
+    """Calcule les extrémités (4*(2*size+1), 3) des segments de la grille d'un plan normal à l'axe."""
     axis = vector_normalize(axis)
     orthogonal_vector = Vector3(1, 0, 0) if abs(axis.x) < abs(axis.y) else Vector3(0, 1, 0)
     v1 = cross_product(axis, orthogonal_vector)
     v2 = cross_product(axis, v1)
+    v1, v2 = as_vector_array([v1, v2])
 
-    for i in range(-size, size + 1):
-        start1 = Vector3(v1.x * -size + v2.x * i, v1.y * -size + v2.y * i, v1.z * -size + v2.z * i)
-        end1 = Vector3(v1.x * size + v2.x * i, v1.y * size + v2.y * i, v1.z * size + v2.z * i)
-        start2 = Vector3(v2.x * -size + v1.x * i, v2.y * -size + v1.y * i, v2.z * -size + v1.z * i)
-        end2 = Vector3(v2.x * size + v1.x * i, v2.y * size + v1.y * i, v2.z * size + v1.z * i)
-        
-        pr.draw_line_3d(start1, end1, color)
-        pr.draw_line_3d(start2, end2, color)
+    steps = np.arange(-size, size + 1)[:, np.newaxis]
+    vertices = np.empty((len(steps), 4, 3))
+    vertices[:, 0] = v1 * -size + v2 * steps
+    vertices[:, 1] = v1 * size + v2 * steps
+    vertices[:, 2] = v2 * -size + v1 * steps
+    vertices[:, 3] = v2 * size + v1 * steps
+    return vertices.reshape(-1, 3)
+
+def plane_grid_model(axis, size):
+    """Retourne le modèle GPU de la grille, reconstruit seulement quand l'axe ou la taille change."""
+    key = (axis.x, axis.y, axis.z, size)
+    cached = plane_grid_cache.get(size)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    if cached is not None:
+        pr.unload_model(cached[1])
+
+    vertices = plane_grid_vertices(axis, size)
+    segments = np.arange(len(vertices)).reshape(-1, 2)
+    model = create_gpu_model(vertices, edges_to_triangles(segments), dynamic=False)
+    plane_grid_cache[size] = (key, model)
+    return model
+
+def draw_plane(axis, size=5, color=pr.GRAY):
+    """Dessine un plan basé sur un vecteur normal et une taille."""
+    if software_mode_active():
+        segments = plane_grid_vertices(axis, size).reshape(-1, 2, 3)
+        draw_software_lines(segments[:, 0], segments[:, 1], color)
+        return
+    model = plane_grid_model(axis, size)
+    # Toute la grille part en un seul appel de dessin, comme les arêtes des meshes
+    pr.rl_draw_render_batch_active()
+    begin_overlay_passes()
+    pr.draw_model_wires(model, Vector3(0, 0, 0), 1.0, color)
+    end_overlay_passes()
 
 def draw_coordinate_axes(origin, scale=3):
     """Dessine les axes de coordonnées standard X, Y, Z à partir de l'origine."""
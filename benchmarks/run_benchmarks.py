@@ -0,0 +1,254 @@
+"""Mesure les chemins critiques (matrices, transformations, vecteurs, chargement PLY) sans ouvrir de fenêtre raylib.
+
+Utilisation depuis la racine du dépôt :
+    python -m benchmarks.run_benchmarks --output benchmarks/results.json
+    python -m benchmarks.run_benchmarks --quick --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+from pyray import Vector3
+
+from benchmarks.synthetic_meshes import grid_mesh, random_axes, random_transforms
+from ply_functions import load_ply_arrays, parsed_ply_cache, write_binary_ply
+from tp1_functions import (
+    cross_product,
+    cross_products,
+    dot_product,
+    dot_products,
+    vector_length,
+    vector_lengths,
+    vector_normalize,
+    vectors_normalize,
+)
+from tp3_exo1 import (
+    RenderMesh,
+    apply_transformations_batch,
+    apply_transformations_homogeneous,
+    cached_rotation_matrix,
+    initialize_mesh_for_transforming,
+    rotation_matrices_homogeneous,
+    rotation_matrix_homogeneous,
+    scaling_matrices_homogeneous,
+    scaling_matrix_homogeneous,
+    to_homogeneous,
+)
+
+VERTEX_COUNTS = [8, 1_000, 100_000, 1_000_000, 10_000_000]
+INSTANCE_COUNTS = [1, 100, 10_000, 100_000]
+QUICK_MAX_VERTICES = 100_000
+QUICK_MAX_INSTANCES = 10_000
+
+# Durée minimale cumulée et nombre maximal de répétitions par mesure
+MIN_TOTAL_TIME = 0.2
+MAX_REPEATS = 20
+
+# Ralentissement relatif au-delà duquel une mesure est signalée comme régression
+DEFAULT_THRESHOLD = 0.2
+
+def time_function(function):
+    """Chronomètre function jusqu'à MIN_TOTAL_TIME cumulé ou MAX_REPEATS appels et retourne les statistiques."""
+    timings = []
+    while len(timings) < MAX_REPEATS and (not timings or sum(timings) < MIN_TOTAL_TIME):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "repeats": len(timings)}
+
+def bench_matrix_builders(count):
+    """Construction de count matrices de rotation et de mise à l'échelle, une par appel."""
+    axes = [Vector3(*axis) for axis in random_axes(count)]
+    angles = np.linspace(0, 2 * np.pi, count)
+
+    def build():
+        for axis, angle in zip(axes, angles):
+            rotation_matrix_homogeneous(axis, angle)
+            scaling_matrix_homogeneous(axis, 2.0)
+    return time_function(build)
+
+def bench_matrix_batches(count):
+    """Mêmes matrices que bench_matrix_builders, construites en un appel vectorisé (N,4,4)."""
+    axes = random_axes(count)
+    angles = np.linspace(0, 2 * np.pi, count)
+    factors = np.full(count, 2.0)
+    rotations = np.empty((count, 4, 4))
+    scalings = np.empty((count, 4, 4))
+
+    def build():
+        rotation_matrices_homogeneous(axes, angles, out=rotations)
+        scaling_matrices_homogeneous(axes, factors, out=scalings)
+    return time_function(build)
+
+def bench_matrix_cache(count):
+    """count appels à cached_rotation_matrix sur un petit nombre de paramètres qui se répètent."""
+    axes = [Vector3(*axis) for axis in random_axes(8)]
+    angles = np.linspace(0, 2 * np.pi, 8)
+
+    def build():
+        for index in range(count):
+            cached_rotation_matrix(axes[index % 8], angles[index // 8 % 8])
+    return time_function(build)
+
+def bench_vector_helpers(count):
+    """Appels scalaires des fonctions de tp1_functions sur count couples de Vector3."""
+    vectors = [Vector3(*axis) for axis in random_axes(2 * count)]
+
+    def run():
+        for a, b in zip(vectors[::2], vectors[1::2]):
+            cross_product(a, b)
+            dot_product(a, b)
+            vector_length(a)
+            vector_normalize(b)
+    return time_function(run)
+
+def bench_vector_arrays(count):
+    """Mêmes opérations que bench_vector_helpers, en un appel vectorisé sur des tableaux (N,3)."""
+    vectors = random_axes(2 * count)
+    a, b = vectors[::2], vectors[1::2]
+
+    def run():
+        cross_products(a, b)
+        dot_products(a, b)
+        vector_lengths(a)
+        vectors_normalize(b)
+    return time_function(run)
+
+def bench_apply_transformations(vertex_count):
+    """Transformation d'un mesh complet avec apply_transformations_homogeneous (mode float32)."""
+    vertices, faces = grid_mesh(vertex_count)
+    # Seuls les sommets comptent ici : on évite de dériver la topologie
+    mesh = RenderMesh.from_arrays(vertices, faces[:0])
+    initialize_mesh_for_transforming(mesh, dtype=np.float32)
+    rotation = rotation_matrix_homogeneous(Vector3(1, 1, 0), 0.5)
+    scaling = scaling_matrix_homogeneous(Vector3(0, 1, 0), 2.0)
+    return time_function(lambda: apply_transformations_homogeneous(mesh, np.eye(4), rotation, scaling, np.eye(4)))
+
+def bench_batch_transform(instance_count):
+    """Transformation d'un cube (8 sommets) par instance_count matrices en un seul appel."""
+    vertices, _ = grid_mesh(8)
+    vertices_homogeneous = to_homogeneous(vertices)
+    transforms = random_transforms(instance_count)
+    out = np.empty((instance_count, len(vertices), 3))
+    work = np.empty((instance_count, len(vertices), 4))
+    return time_function(lambda: apply_transformations_batch(vertices_homogeneous, transforms, out=out, work=work))
+
+def write_ascii_ply(file_path, vertices, faces):
+    """Écrit des sommets et des faces triangulaires dans un fichier PLY ASCII."""
+    with open(file_path, "w") as file:
+        file.write(
+            "ply\nformat ascii 1.0\n"
+            f"element vertex {len(vertices)}\nproperty float x\nproperty float y\nproperty float z\n"
+            f"element face {len(faces)}\nproperty list uchar int vertex_indices\nend_header\n"
+        )
+        np.savetxt(file, vertices, fmt="%.6f")
+        np.savetxt(file, np.column_stack((np.full(len(faces), 3), faces)), fmt="%d")
+
+def bench_mesh_loading(vertex_count, directory):
+    """Lecture d'un PLY binaire et d'un PLY ASCII synthétiques, sans cache puis via le cache .npz (ASCII seulement), et dérivation de la topologie."""
+    vertices, faces = grid_mesh(vertex_count)
+    path = os.path.join(directory, f"grid_{vertex_count}.ply")
+    ascii_path = os.path.join(directory, f"grid_{vertex_count}_ascii.ply")
+    write_binary_ply(path, vertices, faces)
+    write_ascii_ply(ascii_path, vertices, faces)
+    load_ply_arrays(ascii_path)  # Remplit le cache disque
+
+    def load_cached():
+        # Vider le cache mémoire force la relecture du .npz à chaque répétition
+        parsed_ply_cache.clear()
+        load_ply_arrays(ascii_path)
+
+    try:
+        return {
+            "parse": time_function(lambda: load_ply_arrays(path, use_cache=False)),
+            "parse_ascii": time_function(lambda: load_ply_arrays(ascii_path, use_cache=False)),
+            "load_cached": time_function(load_cached),
+            "topology": time_function(lambda: RenderMesh.from_arrays(vertices, faces)),
+        }
+    finally:
+        # Ne pas garder les meshes synthétiques de chaque taille en mémoire jusqu'à la fin de la suite
+        parsed_ply_cache.clear()
+
+def run_suite(max_vertices, max_instances):
+    """Exécute toutes les mesures et retourne un dictionnaire nom -> statistiques."""
+    results = {}
+    vertex_counts = [count for count in VERTEX_COUNTS if count <= max_vertices]
+    instance_counts = [count for count in INSTANCE_COUNTS if count <= max_instances]
+
+    for count in instance_counts:
+        results[f"matrix_builders/{count}"] = bench_matrix_builders(count)
+        results[f"matrix_batches/{count}"] = bench_matrix_batches(count)
+        results[f"matrix_cache/{count}"] = bench_matrix_cache(count)
+        results[f"vector_helpers/{count}"] = bench_vector_helpers(count)
+        results[f"vector_arrays/{count}"] = bench_vector_arrays(count)
+        results[f"batch_transform/{count}"] = bench_batch_transform(count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in vertex_counts:
+            results[f"apply_transformations/{count}"] = bench_apply_transformations(count)
+            loading = bench_mesh_loading(count, directory)
+            results[f"load_ply/{count}"] = loading["parse"]
+            results[f"load_ply_ascii/{count}"] = loading["parse_ascii"]
+            results[f"load_ply_ascii_cached/{count}"] = loading["load_cached"]
+            results[f"mesh_topology/{count}"] = loading["topology"]
+
+    for name, stats in results.items():
+        print(f"{name:<32} {stats['median_s'] * 1e3:>12.3f} ms  (min {stats['min_s'] * 1e3:.3f} ms, {stats['repeats']} répétitions)")
+    return results
+
+def compare_results(results, baseline, threshold):
+    """Compare les meilleurs temps à une référence et retourne la liste des mesures ralenties de plus de threshold."""
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        # Le minimum est moins sensible que la médiane au bruit de la machine
+        ratio = stats["min_s"] / baseline[name]["min_s"]
+        status = "RÉGRESSION" if ratio > 1 + threshold else "ok"
+        print(f"{name:<32} x{ratio:>6.2f}  {status}")
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks sans fenêtre des transformations et de la géométrie.")
+    parser.add_argument("--output", default="benchmarks/results.json", help="fichier JSON de sortie")
+    parser.add_argument("--compare", help="fichier JSON de référence pour détecter les régressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="ralentissement relatif toléré (0.2 = 20 %%)")
+    parser.add_argument("--quick", action="store_true", help=f"limite les tailles à {QUICK_MAX_VERTICES} sommets et {QUICK_MAX_INSTANCES} instances")
+    parser.add_argument("--max-vertices", type=int, default=VERTEX_COUNTS[-1])
+    parser.add_argument("--max-instances", type=int, default=INSTANCE_COUNTS[-1])
+    args = parser.parse_args()
+
+    max_vertices = min(args.max_vertices, QUICK_MAX_VERTICES) if args.quick else args.max_vertices
+    max_instances = min(args.max_instances, QUICK_MAX_INSTANCES) if args.quick else args.max_instances
+    results = run_suite(max_vertices, max_instances)
+
+    report = {
+        "metadata": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Résultats écrits dans {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        if compare_results(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
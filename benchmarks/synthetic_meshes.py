@@ -0,0 +1,27 @@
+import numpy as np
+
+def grid_mesh(vertex_count):
+    """Génère une surface ondulée en grille d'environ vertex_count sommets, triangulée en (n-1)² × 2 faces."""
+    n = max(2, int(np.ceil(np.sqrt(vertex_count))))
+    u, v = np.meshgrid(np.linspace(-1, 1, n), np.linspace(-1, 1, n), indexing="ij")
+    vertices = np.column_stack((u.ravel(), 0.1 * np.sin(4 * u.ravel()) * np.cos(4 * v.ravel()), v.ravel()))
+
+    # Deux triangles par cellule de la grille
+    corners = (np.arange(n - 1)[:, np.newaxis] * n + np.arange(n - 1)).ravel()
+    faces = np.concatenate((
+        np.column_stack((corners, corners + 1, corners + n)),
+        np.column_stack((corners + 1, corners + n + 1, corners + n)),
+    )).astype(np.int32)
+    return vertices, faces
+
+def random_axes(count, seed=0):
+    """Génère count axes aléatoires (non normalisés) sous forme de tableau (N,3)."""
+    return np.random.default_rng(seed).uniform(-1, 1, (count, 3))
+
+def random_transforms(count, seed=0):
+    """Génère une pile (N,4,4) de matrices affines aléatoires (rotation/échelle + translation)."""
+    rng = np.random.default_rng(seed)
+    transforms = np.tile(np.eye(4), (count, 1, 1))
+    transforms[:, :3, :3] = rng.normal(size=(count, 3, 3))
+    transforms[:, :3, 3] = rng.uniform(-5, 5, (count, 3))
+    return transforms
@@ -0,0 +1,74 @@
+import pyray as pr
+import numpy as np
+
+from tp1_functions import as_vector_array, cross_products, vectors_normalize
+
+def mesh_bounding_sphere(vertices):
+    """Calcule une sphère englobante (centre, rayon) à partir de la boîte englobante alignée des sommets."""
+    vertices = np.asarray(vertices)
+    center = (vertices.min(axis=0) + vertices.max(axis=0)) / 2
+    radius = np.linalg.norm(vertices - center, axis=1).max()
+    return center, radius
+
+def instance_bounding_spheres(center, radius, transforms):
+    """Transforme la sphère englobante du mesh par chaque matrice (N,4,4) ; le rayon est majoré par la norme de Frobenius."""
+    transforms = np.asarray(transforms)
+    centers = transforms[:, :3, :3] @ center + transforms[:, :3, 3]
+    # La norme de Frobenius majore l'étirement maximal de la partie linéaire, sans décomposition coûteuse
+    radii = radius * np.sqrt(np.einsum('nij,nij->n', transforms[:, :3, :3], transforms[:, :3, :3]))
+    return centers, radii
+
+def camera_view_projection(camera, aspect):
+    """Construit la matrice vue-projection (4x4) de la pr.Camera3D, avec les distances de découpe de rlgl."""
+    position, target, up = as_vector_array([camera.position, camera.target, camera.up])
+    forward = vectors_normalize(target - position)[0]
+    right = vectors_normalize(cross_products(forward, up))[0]
+    true_up = cross_products(right, forward)[0]
+
+    view = np.eye(4)
+    view[0, :3], view[1, :3], view[2, :3] = right, true_up, -forward
+    view[:3, 3] = -view[:3, :3] @ position
+
+    near = pr.rl_get_cull_distance_near()
+    far = pr.rl_get_cull_distance_far()
+    projection = np.zeros((4, 4))
+    if camera.projection == pr.CAMERA_PERSPECTIVE:
+        f = 1.0 / np.tan(np.radians(camera.fovy) / 2)
+        projection[0, 0] = f / aspect
+        projection[1, 1] = f
+        projection[2, 2] = (far + near) / (near - far)
+        projection[2, 3] = 2 * far * near / (near - far)
+        projection[3, 2] = -1.0
+    else:
+        # En orthographique, fovy est la hauteur visible
+        top = camera.fovy / 2
+        projection[0, 0] = 1.0 / (top * aspect)
+        projection[1, 1] = 1.0 / top
+        projection[2, 2] = -2.0 / (far - near)
+        projection[2, 3] = -(far + near) / (far - near)
+        projection[3, 3] = 1.0
+    return projection @ view
+
+def frustum_planes(view_projection):
+    """Extrait les 6 plans (a, b, c, d) normalisés du tronc de vue, normales vers l'intérieur."""
+    rows = view_projection
+    planes = np.array([
+        rows[3] + rows[0], rows[3] - rows[0],  # gauche, droite
+        rows[3] + rows[1], rows[3] - rows[1],  # bas, haut
+        rows[3] + rows[2], rows[3] - rows[2],  # proche, lointain
+    ])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+def spheres_in_frustum(centers, radii, planes):
+    """Retourne le masque des sphères au moins partiellement dans le tronc de vue (un test vectorisé pour toutes)."""
+    distances = centers @ planes[:, :3].T + planes[:, 3]
+    return np.all(distances >= -radii[:, np.newaxis], axis=1)
+
+def cull_instances(transforms, bounding_sphere, camera, aspect):
+    """Retourne les matrices des instances visibles depuis la caméra et le nombre d'instances écartées."""
+    transforms = np.asarray(transforms)
+    if len(transforms) == 0:
+        return transforms, 0
+    centers, radii = instance_bounding_spheres(*bounding_sphere, transforms)
+    visible = spheres_in_frustum(centers, radii, frustum_planes(camera_view_projection(camera, aspect)))
+    return transforms[visible], int(len(transforms) - visible.sum())
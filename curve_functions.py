@@ -0,0 +1,137 @@
+from math import comb
+
+import numpy as np
+
+from tp1_functions import cross_products, vectors_normalize
+from tp3_exo1 import translation_matrices
+
+# Dernière table d'échantillons de chaque courbe : nom -> (paramètres, table)
+curve_sample_cache = {}
+
+# Nombre d'échantillons de la table d'abscisse curviligne
+ARC_LENGTH_SAMPLES = 4096
+
+def cached_samples(name, key, build):
+    """Retourne la table d'échantillons de la courbe name, reconstruite par build() seulement quand key change."""
+    cached = curve_sample_cache.get(name)
+    if cached is None or cached[0] != key:
+        cached = (key, build())
+        curve_sample_cache[name] = cached
+    return cached[1]
+
+def frenet_frames(points):
+    """Calcule les tangentes, normales et binormales (N,3) unitaires d'une courbe échantillonnée, par différences finies."""
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 2:
+        tangents = np.tile([0.0, 1.0, 0.0], (len(points), 1))
+    else:
+        tangents = vectors_normalize(np.gradient(points, axis=0, edge_order=2 if len(points) > 2 else 1))
+    normals = vectors_normalize(np.gradient(tangents, axis=0)) if len(points) > 1 else np.zeros_like(tangents)
+
+    # Sur une portion droite la normale n'est pas définie : on prend une direction quelconque orthogonale à la tangente
+    degenerate = np.linalg.norm(normals, axis=1) < 0.5
+    if degenerate.any():
+        reference = np.where(np.abs(tangents[degenerate, 1:2]) < 0.9, [[0.0, 1.0, 0.0]], [[1.0, 0.0, 0.0]])
+        normals[degenerate] = vectors_normalize(cross_products(cross_products(tangents[degenerate], reference), tangents[degenerate]))
+    # Retirer la composante tangente laissée par les différences finies
+    normals = vectors_normalize(normals - np.sum(normals * tangents, axis=1, keepdims=True) * tangents)
+    return tangents, normals, cross_products(tangents, normals)
+
+def placement_matrices(points, tangents=None, normals=None):
+    """Construit les matrices (N,4,4) qui placent un objet sur chaque point ; avec un repère, l'axe y local suit la tangente."""
+    matrices = translation_matrices(points)
+    if tangents is not None:
+        matrices[:, :3, 0] = normals
+        matrices[:, :3, 1] = tangents
+        matrices[:, :3, 2] = cross_products(normals, tangents)
+    return matrices
+
+def parametric_curve(function, t_start, t_end):
+    """Ramène une courbe paramétrique vectorisée function(t) -> (x, y, z) sur [t_start, t_end] au paramètre u dans [0, 1]."""
+    def curve(u):
+        return np.column_stack(function(t_start + np.asarray(u, dtype=np.float64) * (t_end - t_start)))
+    return curve
+
+def spiral(start_radius, end_radius, turns, height=0.0):
+    """Spirale d'Archimède dans le plan xz (rayon linéaire en fonction de l'angle), montant de height, paramétrée sur [0, 1]."""
+    def curve(u):
+        u = np.asarray(u, dtype=np.float64)
+        angles = 2 * np.pi * turns * u
+        radii = start_radius + (end_radius - start_radius) * u
+        return np.column_stack((radii * np.cos(angles), height * u, radii * np.sin(angles)))
+    return curve
+
+def bezier(control_points):
+    """Courbe de Bézier de points de contrôle (M,3), évaluée par la base de Bernstein, paramétrée sur [0, 1]."""
+    control_points = np.asarray(control_points, dtype=np.float64)
+    if len(control_points) < 2:
+        raise ValueError("Une courbe de Bézier demande au moins deux points de contrôle")
+    degree = len(control_points) - 1
+    coefficients = np.array([comb(degree, i) for i in range(degree + 1)], dtype=np.float64)
+    powers = np.arange(degree + 1)
+
+    def curve(u):
+        u = np.atleast_1d(np.asarray(u, dtype=np.float64))[:, np.newaxis]
+        basis = coefficients * u ** powers * (1 - u) ** (degree - powers)
+        return basis @ control_points
+    return curve
+
+def catmull_rom(points):
+    """Spline de Catmull-Rom uniforme passant par les points (M,3), paramétrée sur [0, 1]."""
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 2:
+        raise ValueError("Une spline de Catmull-Rom demande au moins deux points")
+    # Points fantômes aux extrémités pour que la spline passe par le premier et le dernier point
+    padded = np.vstack((2 * points[0] - points[1], points, 2 * points[-1] - points[-2]))
+    segment_count = len(points) - 1
+
+    def curve(u):
+        scaled = np.atleast_1d(np.asarray(u, dtype=np.float64)) * segment_count
+        segments = np.clip(np.floor(scaled).astype(np.int64), 0, segment_count - 1)
+        s = (scaled - segments)[:, np.newaxis]
+        p0, p1, p2, p3 = padded[segments], padded[segments + 1], padded[segments + 2], padded[segments + 3]
+        return 0.5 * (
+            2 * p1
+            + (p2 - p0) * s
+            + (2 * p0 - 5 * p1 + 4 * p2 - p3) * s ** 2
+            + (3 * p1 - p0 - 3 * p2 + p3) * s ** 3
+        )
+    return curve
+
+class ArcLengthTable:
+    """Table de l'abscisse curviligne cumulée d'une courbe paramétrée sur [0, 1], construite une seule fois."""
+
+    def __init__(self, curve, samples=ARC_LENGTH_SAMPLES):
+        self.curve = curve
+        self.parameters = np.linspace(0.0, 1.0, samples)
+        segment_lengths = np.linalg.norm(np.diff(curve(self.parameters), axis=0), axis=1)
+        self.lengths = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+
+    @property
+    def total_length(self):
+        return self.lengths[-1]
+
+    def parameters_at(self, distances):
+        """Convertit des abscisses curvilignes (N,) en paramètres u, par recherche dichotomique vectorisée puis interpolation linéaire."""
+        distances = np.clip(np.asarray(distances, dtype=np.float64), 0.0, self.total_length)
+        indices = np.clip(np.searchsorted(self.lengths, distances, side="right") - 1, 0, len(self.lengths) - 2)
+        start, end = self.lengths[indices], self.lengths[indices + 1]
+        spans = end - start
+        fractions = np.divide(distances - start, spans, out=np.zeros_like(distances), where=spans > 0)
+        return self.parameters[indices] + fractions * (self.parameters[indices + 1] - self.parameters[indices])
+
+    def evenly_spaced_parameters(self, count, endpoint=True):
+        """Retourne count paramètres régulièrement espacés le long de la courbe (en longueur, pas en paramètre)."""
+        return self.parameters_at(np.linspace(0.0, self.total_length, count, endpoint=endpoint))
+
+    def evenly_spaced_points(self, count, endpoint=True):
+        """Retourne count points (count,3) régulièrement espacés le long de la courbe."""
+        return self.curve(self.evenly_spaced_parameters(count, endpoint))
+
+def sweep_placements(table, count, aligned=False, endpoint=True):
+    """Construit les matrices (count,4,4) qui répartissent count objets à intervalles égaux le long de la courbe."""
+    points = table.evenly_spaced_points(count, endpoint)
+    if not aligned:
+        return placement_matrices(points)
+    tangents, normals, _ = frenet_frames(points)
+    return placement_matrices(points, tangents, normals)
@@ -0,0 +1,100 @@
+import pyray as pr
+import numpy as np
+
+from culling_functions import instance_bounding_spheres, mesh_bounding_sphere
+from mesh_functions import InstancedMeshRenderer, RenderMesh
+
+# Nombre maximal de niveaux de détail, niveau complet compris
+MAX_LOD_LEVELS = 5
+
+# Un niveau n'est conservé que s'il retire au moins cette fraction des faces du niveau précédent
+MIN_LOD_REDUCTION = 0.25
+
+def cluster_decimate(vertices, faces, cell_size):
+    """Simplifie un mesh par regroupement des sommets sur une grille de pas cell_size (sommets moyens, faces dégénérées retirées)."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, cluster, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    cluster = cluster.ravel()
+
+    # Chaque groupe est représenté par la moyenne de ses sommets
+    clustered_vertices = np.column_stack([np.bincount(cluster, weights=vertices[:, i]) for i in range(3)]) / counts[:, np.newaxis]
+
+    clustered_faces = cluster[faces]
+    valid = (
+        (clustered_faces[:, 0] != clustered_faces[:, 1])
+        & (clustered_faces[:, 1] != clustered_faces[:, 2])
+        & (clustered_faces[:, 0] != clustered_faces[:, 2])
+    )
+    clustered_faces = clustered_faces[valid]
+
+    # Deux faces regroupées sur les mêmes sommets n'en font plus qu'une
+    _, first = np.unique(np.sort(clustered_faces, axis=1), axis=0, return_index=True)
+    return clustered_vertices, clustered_faces[np.sort(first)]
+
+def base_resolution(faces):
+    """Retourne le nombre de cellules le long de la diagonale qui correspond à la finesse du mesh complet."""
+    return max(2.0, np.sqrt(len(faces)))
+
+def build_lod_levels(mesh, max_levels=MAX_LOD_LEVELS):
+    """Construit les niveaux de détail d'un mesh (le niveau 0 est le mesh lui-même) ; la résolution est divisée par 2 à chaque niveau."""
+    vertices = np.asarray(mesh.vertices)
+    diagonal = np.linalg.norm(vertices.max(axis=0) - vertices.min(axis=0))
+    resolution = base_resolution(mesh.faces)
+    levels = [mesh]
+    for level in range(1, max_levels):
+        if diagonal == 0:
+            break
+        decimated_vertices, decimated_faces = cluster_decimate(vertices, mesh.faces, diagonal * 2 ** level / resolution)
+        if len(decimated_faces) == 0 or len(decimated_faces) > (1 - MIN_LOD_REDUCTION) * len(levels[-1].faces):
+            break
+        levels.append(RenderMesh.from_arrays(decimated_vertices, decimated_faces))
+    return levels
+
+def lod_levels(mesh, max_levels=MAX_LOD_LEVELS):
+    """Retourne les niveaux de détail du mesh, construits au premier appel puis conservés dans son lod_cache."""
+    if max_levels not in mesh.lod_cache:
+        mesh.lod_cache[max_levels] = build_lod_levels(mesh, max_levels)
+    return mesh.lod_cache[max_levels]
+
+def projected_diameters(centers, radii, camera, screen_height):
+    """Estime le diamètre à l'écran (en pixels) de sphères vues par la caméra."""
+    if camera.projection != pr.CAMERA_PERSPECTIVE:
+        # En orthographique, fovy est la hauteur visible : la taille ne dépend pas de la distance
+        return 2 * radii * screen_height / camera.fovy
+    position = np.array([camera.position.x, camera.position.y, camera.position.z])
+    distances = np.maximum(np.linalg.norm(centers - position, axis=1), 1e-6)
+    pixels_per_unit = screen_height / (2 * np.tan(np.radians(camera.fovy) / 2))
+    return 2 * radii * pixels_per_unit / distances
+
+class LodRenderer:
+    """Rendu instancié avec niveaux de détail : chaque instance utilise le niveau le plus grossier qui reste fin à l'écran."""
+
+    def __init__(self, mesh, max_levels=MAX_LOD_LEVELS, **renderer_options):
+        self.levels = lod_levels(mesh, max_levels)
+        self.renderers = [InstancedMeshRenderer(level, **renderer_options) for level in self.levels]
+        self.bounding_sphere = mesh_bounding_sphere(mesh.vertices)
+        self.resolution = base_resolution(mesh.faces)
+
+    def select_levels(self, transforms, camera, screen_height):
+        """Choisit un niveau par instance : le niveau k suffit tant qu'une cellule de sa grille couvre au plus un pixel."""
+        centers, radii = instance_bounding_spheres(*self.bounding_sphere, transforms)
+        diameters = projected_diameters(centers, radii, camera, screen_height)
+        levels = np.floor(np.log2(self.resolution / np.maximum(diameters, 1e-6)))
+        return np.clip(levels, 0, len(self.levels) - 1).astype(int)
+
+    def draw(self, transforms, camera, screen_height, **draw_options):
+        """Dessine toutes les instances, regroupées par niveau de détail (une soumission instanciée par niveau utilisé)."""
+        transforms = np.asarray(transforms)
+        if len(transforms) == 0:
+            return
+        levels = self.select_levels(transforms, camera, screen_height)
+        for level in np.unique(levels):
+            self.renderers[level].draw(transforms[levels == level], **draw_options)
+
+    def unload(self):
+        """Libère les ressources GPU de tous les niveaux."""
+        for renderer in self.renderers:
+            renderer.unload()
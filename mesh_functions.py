@@ -1,16 +1,43 @@
 import pyray as pr
 from pyray import Vector3
-import trimesh
+import numpy as np
+
+from ply_functions import load_ply_arrays
+from raster_functions import draw_software_lines, draw_software_points, draw_software_triangles, software_mode_active
+from tp1_functions import cross_products, vectors_normalize
+
+# Les indices raylib sont des unsigned short : au-delà, on dé-indexe les sommets
+MAX_INDEXED_VERTICES = 65535
+
+# Au-delà de ce nombre de marqueurs, les sommets sont dessinés en points plutôt qu'en sphères instanciées
+VERTEX_MARKER_THRESHOLD = 2000
+
+# Rayon des sphères marquant les sommets (celui des pr.draw_sphere d'origine)
+VERTEX_MARKER_SIZE = 0.05
+
+# Sphère basse résolution partagée par tous les rendus pour marquer les sommets (créée au premier usage)
+vertex_marker_renderers = {}
+
+# Angle (radians) entre deux faces voisines en dessous duquel leur arête commune est une diagonale de triangulation
+FEATURE_EDGE_ANGLE = np.radians(1.0)
 
 def draw_mesh(mesh):
     """Dessine le mesh complet avec sommets, arêtes et faces."""
+    if software_mode_active():
+        vertices = np.asarray(mesh.vertices)
+        edges = mesh.wireframe_edges()
+        draw_software_triangles(vertices[mesh.faces], pr.LIGHTGRAY)
+        draw_software_lines(vertices[edges[:, 0]], vertices[edges[:, 1]], pr.BLACK)
+        draw_software_points(vertices, pr.RED)
+        return
+
     for face in mesh.faces:
         v0 = Vector3(*mesh.vertices[face[0]])
         v1 = Vector3(*mesh.vertices[face[1]])
         v2 = Vector3(*mesh.vertices[face[2]])
         pr.draw_triangle_3d(v0, v1, v2, pr.LIGHTGRAY)
     
-    for edge in mesh.edges:
+    for edge in mesh.wireframe_edges():
         v_start = Vector3(*mesh.vertices[edge[0]])
         v_end = Vector3(*mesh.vertices[edge[1]])
         pr.draw_line_3d(v_start, v_end, pr.BLACK)
@@ -18,7 +45,321 @@ def draw_mesh(mesh):
     for vertex in mesh.vertices:
         pr.draw_sphere(Vector3(*vertex), 0.05, pr.RED)
 
+def freeze(array):
+    """Retourne une copie contiguë en lecture seule d'un tableau de topologie."""
+    array = np.array(array)
+    array.setflags(write=False)
+    return array
+
+def compute_face_normals(vertices, faces):
+    """Calcule les normales unitaires des faces triangulaires (nulles pour les faces dégénérées)."""
+    v0, v1, v2 = (vertices[faces[:, i]] for i in range(3))
+    return vectors_normalize(cross_products(v1 - v0, v2 - v0))
+
+def remove_edges(edges, removed):
+    """Retourne les arêtes de edges absentes de removed, sans tenir compte de leur orientation."""
+    edges = np.sort(edges, axis=1)
+    removed = np.sort(removed, axis=1)
+    # Chaque arête non orientée est codée par un entier unique pour une comparaison vectorisée
+    size = max(edges.max(initial=0), removed.max(initial=0)) + 1
+    keys = edges[:, 0].astype(np.int64) * size + edges[:, 1]
+    removed_keys = removed[:, 0].astype(np.int64) * size + removed[:, 1]
+    return edges[~np.isin(keys, removed_keys)]
+
+class RenderMesh:
+    """Mesh de rendu léger : topologie immuable précalculée une fois et tampon de sommets transformés modifiable."""
+
+    def __init__(self, vertices, faces, edges, edges_unique, face_adjacency, face_adjacency_edges):
+        # Seul ce tampon est réécrit à chaque transformation : aucun cache n'en dépend
+        self.vertices = np.array(vertices, dtype=np.float64)
+        self.faces = freeze(faces)
+        self.edges = freeze(edges)
+        self.edges_unique = freeze(edges_unique)
+        self.face_adjacency = freeze(face_adjacency)
+        self.face_adjacency_edges = freeze(face_adjacency_edges)
+        self.face_normals = freeze(compute_face_normals(self.vertices, self.faces))
+        self.edge_cache = {}
+        self.lod_cache = {}
+
+    def wireframe_edges(self, feature_only=False, feature_angle=FEATURE_EDGE_ANGLE):
+        """Retourne les arêtes non orientées à dessiner, sans doublon ; feature_only écarte les diagonales entre faces coplanaires."""
+        key = (feature_only, feature_angle)
+        if key not in self.edge_cache:
+            edges = self.edges_unique
+            if feature_only:
+                edges = remove_edges(edges, self.smooth_edges(feature_angle))
+            self.edge_cache[key] = freeze(edges)
+        return self.edge_cache[key]
+
+    def smooth_edges(self, feature_angle):
+        """Retourne les arêtes partagées par deux faces dont les normales forment un angle inférieur à feature_angle."""
+        normals_a = self.face_normals[self.face_adjacency[:, 0]]
+        normals_b = self.face_normals[self.face_adjacency[:, 1]]
+        cos_angles = np.einsum('ij,ij->i', normals_a, normals_b)
+        return self.face_adjacency_edges[cos_angles > np.cos(feature_angle)]
+
+    @classmethod
+    def from_arrays(cls, vertices, faces):
+        """Construit un RenderMesh en dérivant arêtes et adjacence des faces de manière vectorisée."""
+        faces = np.asarray(faces)
+        # Arêtes orientées de chaque face, dans le même ordre que trimesh : (0,1), (1,2), (2,0)
+        edges = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+        edges_sorted = np.sort(edges, axis=1)
+        size = np.int64(len(vertices))
+        keys = edges_sorted[:, 0].astype(np.int64) * size + edges_sorted[:, 1]
+        _, unique_index = np.unique(keys, return_index=True)
+
+        # Deux arêtes consécutives de même clé après tri relient deux faces voisines
+        order = np.argsort(keys, kind="stable")
+        shared = np.nonzero(keys[order[1:]] == keys[order[:-1]])[0]
+        face_adjacency = np.column_stack((order[shared] // 3, order[shared + 1] // 3))
+        face_adjacency_edges = edges_sorted[order[shared]]
+        return cls(vertices, faces, edges, edges_sorted[unique_index], face_adjacency, face_adjacency_edges)
+
+    @classmethod
+    def from_trimesh(cls, mesh):
+        """Construit un RenderMesh en dérivant une seule fois la topologie d'un trimesh.Trimesh."""
+        return cls(mesh.vertices, mesh.faces, mesh.edges, mesh.edges_unique, mesh.face_adjacency, mesh.face_adjacency_edges)
+
 def load_ply_file(file_path):
-    """Charge un fichier PLY et retourne le mesh en tant que structure de données trimesh."""
-    mesh = trimesh.load(file_path)
-    return mesh
\ No newline at end of file
+    """Charge un fichier PLY et retourne le mesh en tant que RenderMesh (topologie précalculée)."""
+    vertices, faces = load_ply_arrays(file_path)
+    return RenderMesh.from_arrays(vertices, faces)
+
+def edges_to_triangles(edges):
+    """Convertit des arêtes (a, b) en triangles dégénérés (a, b, b) dessinables en mode fil de fer."""
+    edges = np.asarray(edges)
+    return np.column_stack((edges[:, 0], edges[:, 1], edges[:, 1]))
+
+# Shader d'instanciation : chaque instance apporte sa propre matrice de transformation
+INSTANCING_VERTEX_SHADER = """
+#version 330
+in vec3 vertexPosition;
+in mat4 instanceTransform;
+uniform mat4 mvp;
+void main()
+{
+    gl_Position = mvp*instanceTransform*vec4(vertexPosition, 1.0);
+}
+"""
+
+INSTANCING_FRAGMENT_SHADER = """
+#version 330
+uniform vec4 colDiffuse;
+out vec4 finalColor;
+void main()
+{
+    finalColor = colDiffuse;
+}
+"""
+
+def create_gpu_model(vertices, triangles=None, dynamic=True):
+    """Alloue un pr.Mesh (positions + indices éventuels), l'envoie au GPU et retourne le pr.Model associé."""
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+    gpu_mesh = pr.ffi.new("Mesh *")
+    gpu_mesh.vertexCount = len(vertices)
+    gpu_mesh.triangleCount = len(vertices) // 3 if triangles is None else len(triangles)
+
+    # raylib libère lui-même ces tableaux (UnloadModel) : ils doivent venir de son allocateur
+    gpu_mesh.vertices = pr.ffi.cast("float *", pr.mem_alloc(vertices.nbytes))
+    pr.ffi.memmove(gpu_mesh.vertices, pr.ffi.from_buffer(vertices), vertices.nbytes)
+    if triangles is not None:
+        triangles = np.ascontiguousarray(triangles, dtype=np.uint16)
+        gpu_mesh.indices = pr.ffi.cast("unsigned short *", pr.mem_alloc(triangles.nbytes))
+        pr.ffi.memmove(gpu_mesh.indices, pr.ffi.from_buffer(triangles), triangles.nbytes)
+
+    pr.upload_mesh(gpu_mesh, dynamic)
+    return pr.load_model_from_mesh(gpu_mesh[0])
+
+def create_face_and_edge_models(vertices, faces, edges, dynamic=True):
+    """Crée les modèles GPU des faces et des arêtes ; retourne aussi les tables de regroupement si le mesh est dé-indexé."""
+    faces = np.asarray(faces)
+    edge_triangles = edges_to_triangles(edges)
+
+    if len(vertices) <= MAX_INDEXED_VERTICES:
+        face_model = create_gpu_model(vertices, faces, dynamic)
+        edge_model = create_gpu_model(vertices, edge_triangles, dynamic)
+        return face_model, edge_model, None, None
+
+    # Sans indices, chaque triangle possède ses propres sommets : on garde la table de regroupement
+    face_gather = faces.ravel()
+    edge_gather = edge_triangles.ravel()
+    face_model = create_gpu_model(np.asarray(vertices)[face_gather], None, dynamic)
+    edge_model = create_gpu_model(np.asarray(vertices)[edge_gather], None, dynamic)
+    return face_model, edge_model, face_gather, edge_gather
+
+def begin_overlay_passes():
+    """Prépare le dessin des arêtes et sommets en désactivant l'élimination des faces arrière."""
+    # Les triangles dégénérés des arêtes n'ont pas d'orientation et tous les sommets doivent rester visibles
+    pr.rl_disable_backface_culling()
+
+def end_overlay_passes():
+    """Rétablit l'état rlgl modifié par begin_overlay_passes."""
+    pr.rl_enable_backface_culling()
+
+def icosahedron_arrays():
+    """Génère un icosaèdre de rayon 1 (12 sommets, 20 faces orientées vers l'extérieur)."""
+    phi = (1 + np.sqrt(5)) / 2
+    vertices = np.array([
+        [-1, phi, 0], [1, phi, 0], [-1, -phi, 0], [1, -phi, 0],
+        [0, -1, phi], [0, 1, phi], [0, -1, -phi], [0, 1, -phi],
+        [phi, 0, -1], [phi, 0, 1], [-phi, 0, -1], [-phi, 0, 1],
+    ]) / np.sqrt(1 + phi ** 2)
+    faces = np.array([
+        [0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11],
+        [1, 5, 9], [5, 11, 4], [11, 10, 2], [10, 7, 6], [7, 1, 8],
+        [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8], [3, 8, 9],
+        [4, 9, 5], [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1],
+    ])
+    return vertices, faces
+
+def marker_transforms(positions, size):
+    """Calcule les matrices (M,4,4) qui placent un marqueur de rayon size à chaque position (M,3)."""
+    positions = np.asarray(positions).reshape(-1, 3)
+    transforms = np.zeros((len(positions), 4, 4), dtype=np.float32)
+    transforms[:, 0, 0] = transforms[:, 1, 1] = transforms[:, 2, 2] = size
+    transforms[:, :3, 3] = positions
+    transforms[:, 3, 3] = 1.0
+    return transforms
+
+def draw_vertex_markers(positions, size, color):
+    """Dessine une sphère basse résolution à chaque position, en un seul lot instancié."""
+    if "sphere" not in vertex_marker_renderers:
+        vertices, faces = icosahedron_arrays()
+        vertex_marker_renderers["sphere"] = InstancedMeshRenderer(RenderMesh.from_arrays(vertices, faces))
+    vertex_marker_renderers["sphere"].draw(marker_transforms(positions, size), show_edges=False, show_vertices=False, face_color=color)
+
+class MeshRenderer:
+    """Rendu d'un mesh dont la topologie réside sur le GPU : seul le tampon de sommets est mis à jour à chaque image."""
+
+    def __init__(self, mesh, face_color=pr.LIGHTGRAY, edge_color=pr.BLACK, vertex_color=pr.RED, point_size=6.0, feature_edges_only=False,
+                 marker_size=VERTEX_MARKER_SIZE, marker_threshold=VERTEX_MARKER_THRESHOLD):
+        self.face_color = face_color
+        self.edge_color = edge_color
+        self.vertex_color = vertex_color
+        self.point_size = point_size
+        self.marker_size = marker_size
+        self.marker_threshold = marker_threshold
+        self.vertices = np.array(mesh.vertices, dtype=np.float32)
+        self.face_model, self.edge_model, self.face_gather, self.edge_gather = create_face_and_edge_models(
+            mesh.vertices, mesh.faces, mesh.wireframe_edges(feature_edges_only), dynamic=True
+        )
+
+    def update_vertices(self, vertices):
+        """Copie les sommets transformés dans les tampons GPU (un seul transfert par modèle)."""
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        self.vertices = vertices
+        for model, gather in ((self.face_model, self.face_gather), (self.edge_model, self.edge_gather)):
+            data = vertices if gather is None else np.ascontiguousarray(vertices[gather])
+            pr.update_mesh_buffer(model.meshes[0], 0, pr.ffi.from_buffer(data), data.nbytes, 0)
+
+    def draw(self, show_faces=True, show_edges=True, show_vertices=True):
+        """Dessine faces, arêtes et sommets en un nombre constant d'appels."""
+        origin = Vector3(0, 0, 0)
+        # Vide le lot rlgl en attente pour que les changements d'état ne s'appliquent qu'à nos modèles
+        pr.rl_draw_render_batch_active()
+        if show_faces:
+            pr.draw_model(self.face_model, origin, 1.0, self.face_color)
+
+        # Peu de sommets : sphères instanciées ; au-delà du seuil, de simples points
+        use_markers = len(self.vertices) <= self.marker_threshold
+        if show_vertices and use_markers:
+            draw_vertex_markers(self.vertices, self.marker_size, self.vertex_color)
+
+        begin_overlay_passes()
+        if show_edges:
+            pr.draw_model_wires(self.edge_model, origin, 1.0, self.edge_color)
+
+        if show_vertices and not use_markers:
+            pr.rl_set_point_size(self.point_size)
+            pr.rl_enable_point_mode()
+            pr.draw_model(self.face_model, origin, 1.0, self.vertex_color)
+            pr.rl_disable_point_mode()
+        end_overlay_passes()
+
+    def unload(self):
+        """Libère les ressources GPU et CPU des modèles."""
+        pr.unload_model(self.face_model)
+        pr.unload_model(self.edge_model)
+
+class InstancedMeshRenderer:
+    """Rendu instancié d'un mesh partagé : toutes les instances sont dessinées en une seule soumission par passe."""
+
+    def __init__(self, mesh, face_color=pr.LIGHTGRAY, edge_color=pr.BLACK, vertex_color=pr.RED, point_size=6.0, feature_edges_only=False,
+                 marker_size=VERTEX_MARKER_SIZE, marker_threshold=VERTEX_MARKER_THRESHOLD):
+        self.face_color = face_color
+        self.edge_color = edge_color
+        self.vertex_color = vertex_color
+        self.point_size = point_size
+        self.marker_size = marker_size
+        self.marker_threshold = marker_threshold
+        self.vertices = np.array(mesh.vertices, dtype=np.float32)
+
+        # Les sommets d'origine restent sur le GPU ; seules les matrices changent d'une image à l'autre
+        self.face_model, self.edge_model, _, _ = create_face_and_edge_models(
+            mesh.vertices, mesh.faces, mesh.wireframe_edges(feature_edges_only), dynamic=False
+        )
+
+        self.shader = pr.load_shader_from_memory(INSTANCING_VERTEX_SHADER, INSTANCING_FRAGMENT_SHADER)
+        self.shader.locs[pr.SHADER_LOC_MATRIX_MVP] = pr.get_shader_location(self.shader, "mvp")
+        self.shader.locs[pr.SHADER_LOC_COLOR_DIFFUSE] = pr.get_shader_location(self.shader, "colDiffuse")
+        self.shader.locs[pr.SHADER_LOC_VERTEX_INSTANCETRANSFORM] = pr.get_shader_location_attrib(self.shader, "instanceTransform")
+        self.material = pr.load_material_default()
+        self.material.shader = self.shader
+
+        self.capacity = 0
+        self.transforms_buffer = None
+
+    def upload_transforms(self, transforms):
+        """Copie les matrices (N,4,4) dans un tableau de pr.Matrix réutilisé d'une image à l'autre."""
+        transforms = np.ascontiguousarray(transforms, dtype=np.float32)
+        count = len(transforms)
+        if count > self.capacity:
+            self.capacity = max(count, 2 * self.capacity)
+            self.transforms_buffer = pr.ffi.new("Matrix[]", self.capacity)
+        # pr.Matrix stocke ses champs ligne par ligne (m0, m4, m8, m12, ...) : même disposition que numpy
+        if count > 0:
+            pr.ffi.memmove(self.transforms_buffer, pr.ffi.from_buffer(transforms), transforms.nbytes)
+        return count
+
+    def draw_pass(self, model, color, count):
+        """Dessine toutes les instances d'un modèle avec la couleur donnée."""
+        self.material.maps[pr.MATERIAL_MAP_DIFFUSE].color = color
+        pr.draw_mesh_instanced(model.meshes[0], self.material, self.transforms_buffer, count)
+
+    def draw(self, transforms, show_faces=True, show_edges=True, show_vertices=True, face_color=None):
+        """Dessine le mesh pour chaque matrice de transformation (N,4,4) ; face_color remplace ponctuellement la couleur des faces."""
+        # Toutes les instances écartées (culling, aucun cube) : rien à envoyer, le tampon peut ne pas exister encore
+        if len(transforms) == 0:
+            return
+        count = self.upload_transforms(transforms)
+
+        pr.rl_draw_render_batch_active()
+        if show_faces:
+            self.draw_pass(self.face_model, self.face_color if face_color is None else face_color, count)
+
+        use_markers = count * len(self.vertices) <= self.marker_threshold
+        if show_vertices and use_markers:
+            # Position de chaque sommet de chaque instance : (N,V,3)
+            transforms = np.asarray(transforms)
+            positions = self.vertices @ transforms[:, :3, :3].transpose(0, 2, 1) + transforms[:, np.newaxis, :3, 3]
+            draw_vertex_markers(positions, self.marker_size, self.vertex_color)
+
+        begin_overlay_passes()
+        if show_edges:
+            pr.rl_enable_wire_mode()
+            self.draw_pass(self.edge_model, self.edge_color, count)
+            pr.rl_disable_wire_mode()
+
+        if show_vertices and not use_markers:
+            pr.rl_set_point_size(self.point_size)
+            pr.rl_enable_point_mode()
+            self.draw_pass(self.face_model, self.vertex_color, count)
+            pr.rl_disable_point_mode()
+        end_overlay_passes()
+
+    def unload(self):
+        """Libère les modèles, le matériau et le shader d'instanciation."""
+        pr.unload_model(self.face_model)
+        pr.unload_model(self.edge_model)
+        pr.unload_material(self.material)
@@ -0,0 +1,183 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pyray as pr
+import numpy as np
+from pyray import Vector3
+
+from basic_drawing_functions import draw_coordinate_axes, draw_plane, draw_transformation_axis, initialize_camera
+from mesh_functions import load_ply_file
+from orbit_functions import OrbitSystem
+from profiling_functions import profile_scope
+from raster_functions import FrameBuffer, begin_software_mode_3d, draw_software_instances, end_software_mode_3d
+from tp3_exo1 import (
+    TransformState, cached_rotation_matrix, initialize_mesh_for_transforming, rotation_matrix_homogeneous, translation_matrix
+)
+from tp3_exo3 import curve_sample_table, uniform_scaling_matrix_homogeneous
+
+def load_scene_mesh(path):
+    """Charge les sommets (V,3) et les faces (F,3) du mesh d'une scène."""
+    mesh = load_ply_file(path)
+    return np.asarray(mesh.vertices), np.asarray(mesh.faces)
+
+def central_transform(state):
+    """Construit la matrice du cube central (translation puis rotation) à partir des valeurs des curseurs."""
+    axis = Vector3(*state["axis"])
+    return translation_matrix(*state["translate"]) @ cached_rotation_matrix(axis, np.radians(state["angle"]))
+
+class Exo1Scene:
+    """Scène de tp3_exo1 : le mesh transformé par les curseurs ; angle_speed (degrés/s) anime la rotation."""
+
+    defaults = {
+        "mesh": "cube.ply", "scale": 1.0, "angle": 0.0, "angle_speed": 0.0, "axis": (1.0, 0.0, 0.0),
+        "translate": (0.0, 0.0, 0.0), "projection_type": -1.0, "d": 1.0,
+    }
+
+    def __init__(self, state, vertices, faces):
+        self.state = state
+        self.mesh = SimpleNamespace(vertices=vertices, faces=faces)
+        initialize_mesh_for_transforming(self.mesh)
+        # Les curseurs sont remplacés par des listes d'une valeur, lues comme les pointeurs ffi
+        self.angle = [state["angle"]]
+        self.transform_state = TransformState(
+            [state["scale"]], self.angle, [[value] for value in state["axis"]],
+            [[value] for value in state["translate"]], [state["projection_type"]], [state["d"]]
+        )
+
+    def render(self, time):
+        self.angle[0] = self.state["angle"] + self.state["angle_speed"] * time
+        self.transform_state.update(self.mesh)
+        axis = self.transform_state.axis
+
+        # Même scène que la fenêtre interactive, dessinée par les fonctions habituelles
+        draw_coordinate_axes(Vector3(0, 0, 0), scale=3)
+        draw_transformation_axis(Vector3(0, 0, 0), axis, scale=3)
+        draw_plane(axis, 10)
+        draw_software_instances(self.mesh.vertices, self.mesh.faces, np.eye(4)[np.newaxis], pr.LIGHTGRAY)
+
+class Exo2Scene:
+    """Scène de tp3_exo2 : le cube central et ses cubes orbitaux, tirés avec une graine fixe."""
+
+    defaults = {
+        "mesh": "cube.ply", "angle": 0.0, "axis": (1.0, 0.0, 0.0), "translate": (0.0, 0.0, 0.0),
+        "orbit_count": 5, "orbit_radius": 5.0, "seed": 0,
+    }
+
+    def __init__(self, state, vertices, faces):
+        self.state = state
+        self.vertices, self.faces = vertices, faces
+        self.orbits = OrbitSystem(state["orbit_count"], rng=np.random.default_rng(state["seed"]))
+
+    def transforms(self, time):
+        """Retourne les matrices (N,4,4) du cube central puis des cubes orbitaux à l'instant time."""
+        central = central_transform(self.state)
+        orbit_transforms = central @ self.orbits.local_transforms(time, self.state["orbit_radius"])
+        return np.concatenate((central[np.newaxis], orbit_transforms))
+
+    def render(self, time):
+        draw_software_instances(self.vertices, self.faces, self.transforms(time), pr.LIGHTGRAY)
+
+class Exo3Scene:
+    """Scène de tp3_exo3 : les cubes tournants répartis le long de la courbe choisie."""
+
+    defaults = {
+        "mesh": "cube.ply", "angle": 0.0, "axis": (1.0, 0.0, 0.0), "translate": (0.0, 0.0, 0.0),
+        "cube_scale": 0.1, "curve_type": 0, "curve_length": 10, "num_turns": 5.0, "spacing": 10.0,
+        "cubes_per_turn": 20.0, "aligned": False,
+    }
+
+    def __init__(self, state, vertices, faces):
+        self.state = state
+        self.vertices, self.faces = vertices, faces
+
+    def transforms(self, time):
+        """Retourne les matrices (N,4,4) des cubes de l'hélice à l'instant time."""
+        state = self.state
+        num_cubes = int(state["num_turns"] * state["cubes_per_turn"])
+        placements = curve_sample_table(
+            state["curve_type"], state["curve_length"], state["spacing"], state["num_turns"], num_cubes, 50.0, state["aligned"]
+        )
+        spin = rotation_matrix_homogeneous(Vector3(0, 1, 0), time) @ uniform_scaling_matrix_homogeneous(state["cube_scale"])
+        return central_transform(state) @ placements @ spin
+
+    def render(self, time):
+        draw_software_instances(self.vertices, self.faces, self.transforms(time), pr.LIGHTGRAY)
+
+# Scènes disponibles pour le rendu hors ligne
+SCENES = {"exo1": Exo1Scene, "exo2": Exo2Scene, "exo3": Exo3Scene}
+
+def scene_state(name, **overrides):
+    """Retourne les valeurs de curseurs par défaut de la scène name, éventuellement remplacées."""
+    return {**SCENES[name].defaults, **overrides}
+
+def create_scene(name, vertices=None, faces=None, **overrides):
+    """Crée la scène name ; le mesh est chargé depuis son fichier sauf si ses tableaux sont fournis."""
+    state = scene_state(name, **overrides)
+    if vertices is None:
+        vertices, faces = load_scene_mesh(state["mesh"])
+    return SCENES[name](state, vertices, faces)
+
+def frame_times(frame_count, fps, start_time=0.0):
+    """Retourne les instants (frame_count,) d'une animation à pas de temps fixe 1/fps."""
+    return start_time + np.arange(frame_count) / fps
+
+class PngFrameWriter:
+    """Écrit chaque image dans un fichier PNG numéroté du dossier directory."""
+
+    def __init__(self, directory, prefix="frame"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+
+    def write(self, index, frame):
+        frame = np.ascontiguousarray(frame)
+        height, width = frame.shape[:2]
+        image = pr.Image(pr.ffi.cast("void *", pr.ffi.from_buffer(frame)), width, height, 1, pr.PIXELFORMAT_UNCOMPRESSED_R8G8B8)
+        path = os.path.join(self.directory, f"{self.prefix}_{index:05d}.png")
+        if not pr.export_image(image, path):
+            raise OSError(f"Impossible d'écrire l'image {path}")
+
+    def close(self):
+        pass
+
+class RawVideoWriter:
+    """Écrit les images RGB24 brutes les unes à la suite des autres (fichier ou sortie standard avec "-")."""
+
+    def __init__(self, path):
+        self.file = sys.stdout.buffer if path == "-" else open(path, "wb")
+
+    def write(self, index, frame):
+        self.file.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self):
+        if self.file is sys.stdout.buffer:
+            self.file.flush()
+        else:
+            self.file.close()
+
+def render_frames(scene, times, width, height, camera=None):
+    """Génère les images (H,W,3) de la scène aux instants donnés, sans fenêtre ni GPU."""
+    camera = initialize_camera() if camera is None else camera
+    framebuffer = FrameBuffer(width, height)
+    for time in times:
+        framebuffer.clear()
+        begin_software_mode_3d(framebuffer, camera)
+        try:
+            scene.render(time)
+        finally:
+            end_software_mode_3d()
+        yield framebuffer.color
+
+def render_animation(scene, frame_count, fps, writer, width=1000, height=900, start_time=0.0, camera=None, profiler=None):
+    """Rend frame_count images à pas de temps fixe et les transmet dans l'ordre au writer ; le profileur mesure rendu et écriture."""
+    frames = render_frames(scene, frame_times(frame_count, fps, start_time), width, height, camera)
+    for index in range(frame_count):
+        if profiler is not None:
+            profiler.begin_frame()
+        with profile_scope(profiler, "rendu"):
+            frame = next(frames)
+        with profile_scope(profiler, "écriture"):
+            writer.write(index, frame)
+        if profiler is not None:
+            profiler.end_frame()
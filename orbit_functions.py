@@ -0,0 +1,31 @@
+import numpy as np
+
+from tp1_functions import vectors_normalize
+
+from tp3_exo1 import rotation_matrices_homogeneous
+
+class OrbitSystem:
+    """Paramètres de N cubes orbitaux stockés en tableaux contigus (une entrée par cube)."""
+
+    def __init__(self, count, rng=None):
+        rng = np.random.default_rng() if rng is None else rng
+        self.angle_offsets = rng.uniform(0, 2 * np.pi, count)  # Décalage angulaire initial (position de départ sur l'orbite)
+        self.inclinations = rng.uniform(-np.pi / 4, np.pi / 4, count)  # Inclinaison de l'orbite par rapport au plan horizontal (± 45°)
+        self.rotation_axes = vectors_normalize(rng.uniform(-1, 1, (count, 3)))  # Axe de rotation propre (unitaire) de chaque cube
+        self.directions = rng.choice([1.0, -1.0], count)  # Sens de rotation : 1 = horaire, -1 = antihoraire
+        self.transforms = np.zeros((count, 4, 4))
+
+    def __len__(self):
+        return len(self.angle_offsets)
+
+    def local_transforms(self, time, radius, count=None):
+        """Calcule les matrices (count,4,4) des cubes relatives au cube central : rotation propre puis translation orbitale."""
+        count = len(self) if count is None else count
+        angles = time * self.directions[:count] + self.angle_offsets[:count]
+        transforms = rotation_matrices_homogeneous(self.rotation_axes[:count], angles, out=self.transforms[:count])
+
+        # Le mouvement se déroule dans le plan xz, la coordonnée y donne l'inclinaison de l'orbite
+        transforms[:, 0, 3] = np.cos(angles) * radius
+        transforms[:, 1, 3] = np.sin(self.inclinations[:count]) * radius
+        transforms[:, 2, 3] = np.sin(angles) * radius
+        return transforms
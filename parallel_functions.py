@@ -0,0 +1,78 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from offline_functions import create_scene, frame_times, load_scene_mesh, render_frames, scene_state
+
+# Nombre d'images rendues par tâche envoyée à un processus
+DEFAULT_CHUNK_FRAMES = 8
+
+# Scène de chaque processus de travail, construite une seule fois sur le mesh partagé
+worker_context = {}
+
+def share_array(array):
+    """Copie un tableau dans un bloc de mémoire partagée ; retourne le bloc et sa description (nom, forme, type)."""
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+def attach_array(description):
+    """Ouvre un tableau en mémoire partagée à partir de sa description, sans copie ; retourne le bloc et le tableau."""
+    name, shape, dtype = description
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+def initialize_worker(scene_name, overrides, vertices_description, faces_description):
+    """Prépare un processus de travail : attache le mesh partagé et crée la scène."""
+    vertices_block, vertices = attach_array(vertices_description)
+    faces_block, faces = attach_array(faces_description)
+    # Les blocs restent référencés tant que le processus vit, sinon les tableaux pointeraient vers une mémoire libérée
+    worker_context["blocks"] = (vertices_block, faces_block)
+    worker_context["scene"] = create_scene(scene_name, vertices, faces, **overrides)
+
+def render_chunk(times, width, height):
+    """Rend une suite d'images dans un processus de travail ; retourne un tableau (K,H,W,3)."""
+    frames = np.empty((len(times), height, width, 3), dtype=np.uint8)
+    for index, frame in enumerate(render_frames(worker_context["scene"], times, width, height)):
+        frames[index] = frame
+    return frames
+
+def frame_chunks(frame_count, chunk_frames):
+    """Découpe les indices d'images [0, frame_count) en intervalles (début, fin) d'au plus chunk_frames images."""
+    return [(start, min(start + chunk_frames, frame_count)) for start in range(0, frame_count, chunk_frames)]
+
+def write_chunk(writer, start, future):
+    """Attend un morceau et transmet ses images au writer, numérotées à partir de start."""
+    for offset, frame in enumerate(future.result()):
+        writer.write(start + offset, frame)
+
+def render_animation_parallel(scene_name, frame_count, fps, writer, width=1000, height=900, start_time=0.0,
+                              workers=None, chunk_frames=DEFAULT_CHUNK_FRAMES, **overrides):
+    """Rend l'animation par morceaux répartis sur plusieurs processus et transmet les images dans l'ordre au writer."""
+    workers = workers or os.cpu_count() or 1
+    times = frame_times(frame_count, fps, start_time)
+    vertices, faces = load_scene_mesh(scene_state(scene_name, **overrides)["mesh"])
+    vertices_block, vertices_description = share_array(vertices)
+    faces_block, faces_description = share_array(faces)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=initialize_worker,
+            initargs=(scene_name, overrides, vertices_description, faces_description),
+        ) as executor:
+            # Au plus deux morceaux en attente par processus : la mémoire reste bornée pour les longues animations
+            pending = deque()
+            for start, end in frame_chunks(frame_count, chunk_frames):
+                pending.append((start, executor.submit(render_chunk, times[start:end], width, height)))
+                if len(pending) >= 2 * workers:
+                    write_chunk(writer, *pending.popleft())
+            while pending:
+                write_chunk(writer, *pending.popleft())
+    finally:
+        for block in (vertices_block, faces_block):
+            block.close()
+            block.unlink()
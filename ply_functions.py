@@ -0,0 +1,327 @@
+import os
+import tempfile
+import zipfile
+from contextlib import suppress
+
+import numpy as np
+
+# Correspondance entre les types PLY et les types numpy
+PLY_TYPES = {
+    "char": "i1", "int8": "i1",
+    "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2",
+    "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4",
+    "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4",
+    "double": "f8", "float64": "f8",
+}
+
+PLY_BYTE_ORDERS = {"binary_little_endian": "<", "binary_big_endian": ">", "ascii": "<"}
+
+# Répertoire (relatif au fichier PLY) où sont conservés les meshes déjà analysés
+PLY_CACHE_DIRECTORY = ".ply_cache"
+
+# Cache en mémoire des meshes déjà lus pendant l'exécution, indexé par chemin et date de modification
+parsed_ply_cache = {}
+
+def read_ply_header(file_path):
+    """Lit l'en-tête PLY et retourne le format, la liste des éléments (nom, nombre, propriétés) et la taille de l'en-tête en octets."""
+    elements = []
+    ply_format = None
+    with open(file_path, "rb") as file:
+        if file.readline().strip() != b"ply":
+            raise ValueError(f"{file_path} n'est pas un fichier PLY")
+        while True:
+            line = file.readline()
+            if not line:
+                raise ValueError(f"En-tête PLY incomplet dans {file_path}")
+            words = line.decode("ascii").split()
+            if not words or words[0] in ("comment", "obj_info"):
+                continue
+            if words[0] == "format":
+                ply_format = words[1]
+            elif words[0] == "element":
+                elements.append((words[1], int(words[2]), []))
+            elif words[0] == "property":
+                # Propriété scalaire : (nom, type) ; propriété liste : (nom, type du compteur, type des valeurs)
+                if words[1] == "list":
+                    elements[-1][2].append((words[4], PLY_TYPES[words[2]], PLY_TYPES[words[3]]))
+                else:
+                    elements[-1][2].append((words[2], PLY_TYPES[words[1]]))
+            elif words[0] == "end_header":
+                return ply_format, elements, file.tell()
+
+def element_dtype(properties, byte_order, list_length=None):
+    """Construit le dtype structuré d'un élément ; les listes sont supposées de longueur list_length."""
+    fields = []
+    for prop in properties:
+        if len(prop) == 3:
+            if list_length is None:
+                return None
+            fields.append((prop[0] + "_count", byte_order + prop[1]))
+            fields.append((prop[0], byte_order + prop[2], (list_length,)))
+        else:
+            fields.append((prop[0], byte_order + prop[1]))
+    return np.dtype(fields)
+
+def triangulate_faces(polygons):
+    """Découpe des polygones (liste de séquences d'indices) en triangles en éventail."""
+    triangles = [(polygon[0], polygon[i], polygon[i + 1]) for polygon in polygons for i in range(1, len(polygon) - 1)]
+    return np.array(triangles, dtype=np.int32).reshape(-1, 3)
+
+def read_binary_faces(file_path, properties, byte_order, offset, count):
+    """Lit les faces d'un PLY binaire sans analyse par élément lorsque toutes sont des triangles ; indique aussi si la lecture a dû être séquentielle."""
+    dtype = element_dtype(properties, byte_order, list_length=3)
+    list_name = next(prop[0] for prop in properties if len(prop) == 3)
+    if count == 0:
+        return np.empty((0, 3), dtype=np.int32), offset, False
+
+    # Si toutes les faces sont des triangles, le bloc a une taille fixe et se lit d'un coup
+    if offset + count * dtype.itemsize <= os.path.getsize(file_path):
+        candidate = np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+        if np.all(candidate[list_name + "_count"] == 3):
+            # Copie hors de la projection : une vue survivrait au fichier, réécrit ou tronqué ensuite (SIGBUS)
+            return np.array(candidate[list_name], dtype=np.int32), offset + count * dtype.itemsize, False
+
+    # Polygones de tailles variables : lecture séquentielle puis triangulation
+    data = np.memmap(file_path, dtype=np.uint8, mode="r", offset=offset)
+    polygons = []
+    position = 0
+    for _ in range(count):
+        for prop in properties:
+            if len(prop) == 3:
+                count_type = np.dtype(byte_order + prop[1])
+                value_type = np.dtype(byte_order + prop[2])
+                length = int(np.frombuffer(data, count_type, 1, position)[0])
+                position += count_type.itemsize
+                indices = np.frombuffer(data, value_type, length, position)
+                position += length * value_type.itemsize
+                if prop[0] == list_name:
+                    polygons.append(indices)
+            else:
+                position += np.dtype(prop[1]).itemsize
+    return triangulate_faces(polygons), offset + position, True
+
+def read_binary_ply(file_path, elements, byte_order, header_length, dtype=np.float64):
+    """Lit les sommets (au type dtype) et faces d'un PLY binaire via np.memmap ; le troisième résultat indique une lecture séquentielle des polygones."""
+    vertices = np.empty((0, 3), dtype=dtype)
+    faces = np.empty((0, 3), dtype=np.int32)
+    sequential = False
+    offset = header_length
+    for name, count, properties in elements:
+        if name == "face":
+            faces, offset, sequential = read_binary_faces(file_path, properties, byte_order, offset, count)
+            continue
+
+        record_dtype = element_dtype(properties, byte_order)
+        if record_dtype is None:
+            raise ValueError(f"Élément PLY '{name}' avec liste non pris en charge")
+        if name == "vertex" and count > 0:
+            block = np.memmap(file_path, dtype=record_dtype, mode="r", offset=offset, shape=(count,))
+            vertices = element_rows_to_array(block, "vertex", dtype=dtype)
+        offset += count * record_dtype.itemsize
+    return vertices, faces, sequential
+
+def read_ascii_ply(file_path, elements, header_length, dtype=np.float64):
+    """Lit les sommets (au type dtype) et faces d'un PLY ASCII en convertissant le corps du fichier d'un seul bloc."""
+    with open(file_path, "rb") as file:
+        file.seek(header_length)
+        tokens = np.array(file.read().split(), dtype=np.float64)
+
+    vertices = np.empty((0, 3), dtype=dtype)
+    faces = np.empty((0, 3), dtype=np.int32)
+    position = 0
+    for name, count, properties in elements:
+        names = [prop[0] for prop in properties]
+        if all(len(prop) == 2 for prop in properties):
+            block = tokens[position:position + count * len(properties)].reshape(count, len(properties))
+            position += block.size
+            if name == "vertex":
+                vertices = block[:, [names.index("x"), names.index("y"), names.index("z")]].astype(dtype)
+            continue
+
+        if name == "face" and len(properties) == 1:
+            # Cas courant : uniquement des triangles, soit 4 valeurs par face
+            block = tokens[position:position + count * 4]
+            if len(block) == count * 4 and np.all(block[::4] == 3):
+                faces = block.reshape(count, 4)[:, 1:].astype(np.int32)
+                position += block.size
+                continue
+
+        polygons = []
+        for _ in range(count):
+            for prop in properties:
+                if len(prop) == 3:
+                    length = int(tokens[position])
+                    indices = tokens[position + 1:position + 1 + length].astype(np.int32)
+                    position += 1 + length
+                    if name == "face":
+                        polygons.append(indices)
+                else:
+                    position += 1
+        if name == "face":
+            faces = triangulate_faces(polygons)
+    return vertices, faces
+
+def parse_ply(file_path, dtype=np.float64):
+    """Lit un fichier PLY ; retourne sommets, faces et True si l'analyse a été lente (ASCII ou polygones lus un à un)."""
+    ply_format, elements, header_length = read_ply_header(file_path)
+    if ply_format not in PLY_BYTE_ORDERS:
+        raise ValueError(f"Format PLY inconnu : {ply_format}")
+    if ply_format == "ascii":
+        return (*read_ascii_ply(file_path, elements, header_length, dtype), True)
+    return read_binary_ply(file_path, elements, PLY_BYTE_ORDERS[ply_format], header_length, dtype)
+
+def read_ply(file_path, dtype=np.float64):
+    """Lit un fichier PLY (binaire ou ASCII) et retourne les sommets (V,3) et les faces triangulaires (F,3)."""
+    # float64 par défaut : aucune perte sur les coordonnées double ; dtype=np.float32 pour le mode compact
+    vertices, faces, _ = parse_ply(file_path, dtype)
+    return vertices, faces
+
+def ply_cache_path(file_path):
+    """Retourne le chemin du fichier .npz de cache associé à un fichier PLY."""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, PLY_CACHE_DIRECTORY, name + ".npz")
+
+def read_ply_cache(cache_path, stat, dtype=np.float64):
+    """Lit le cache .npz d'un PLY ; retourne (sommets, faces), ou None s'il est absent, périmé, illisible ou d'un autre type de sommets."""
+    try:
+        with np.load(cache_path) as cached:
+            if cached["mtime_ns"] != stat.st_mtime_ns or cached["size"] != stat.st_size:
+                return None
+            if cached["vertices"].dtype != dtype:
+                return None
+            return cached["vertices"], cached["faces"]
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None  # Cache tronqué ou corrompu (écriture interrompue) : on relit le PLY
+
+def write_ply_cache(cache_path, vertices, faces, stat):
+    """Écrit le cache .npz dans un fichier temporaire puis le met en place d'un coup : jamais de cache à moitié écrit."""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".npz.tmp")
+    except OSError:
+        return  # Répertoire en lecture seule : on se passe du cache disque
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            np.savez(file, vertices=vertices, faces=faces, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        with suppress(OSError):
+            os.remove(temporary_path)
+
+def load_ply_arrays(file_path, use_cache=True, dtype=np.float64):
+    """Retourne les sommets (au type dtype) et faces d'un PLY via le cache mémoire puis, pour les fichiers lents à analyser, le cache disque .npz."""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, np.dtype(dtype).str)
+    if use_cache and key in parsed_ply_cache:
+        return parsed_ply_cache[key]
+
+    cache_path = ply_cache_path(file_path)
+    arrays = read_ply_cache(cache_path, stat, dtype) if use_cache else None
+    if arrays is None:
+        vertices, faces, slow = parse_ply(file_path, dtype)
+        arrays = vertices, faces
+        # Un PLY binaire de triangles se relit plus vite par np.memmap qu'un .npz : seul le cas lent va sur disque
+        if use_cache and slow:
+            write_ply_cache(cache_path, vertices, faces, stat)
+    if use_cache:
+        # Les mêmes tableaux sont rendus à chaque appelant : lecture seule pour qu'aucun ne modifie ceux des autres
+        for array in arrays:
+            array.flags.writeable = False
+        parsed_ply_cache[key] = arrays
+    return arrays
+
+def binary_ply_header(vertex_count, face_count):
+    """Retourne l'en-tête d'un PLY binaire little-endian (sommets float, faces triangulaires)."""
+    return (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {vertex_count}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {face_count}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    ).encode("ascii")
+
+def triangle_records(faces):
+    """Convertit des faces (F,3) en enregistrements binaires PLY (compteur uchar + 3 indices int)."""
+    records = np.empty(len(faces), dtype=[("count", "u1"), ("indices", "<i4", (3,))])
+    records["count"] = 3
+    records["indices"] = faces
+    return records
+
+def write_binary_ply(file_path, vertices, faces):
+    """Écrit des sommets et des faces triangulaires dans un fichier PLY binaire little-endian."""
+    vertices = np.ascontiguousarray(vertices, dtype="<f4")
+    with open(file_path, "wb") as file:
+        file.write(binary_ply_header(len(vertices), len(faces)))
+        file.write(vertices.tobytes())
+        file.write(triangle_records(faces).tobytes())
+
+def convert_ply_to_binary(source_path, destination_path):
+    """Convertit un fichier PLY (ASCII ou binaire) en PLY binaire little-endian."""
+    vertices, faces = read_ply(source_path)
+    write_binary_ply(destination_path, vertices, faces)
+
+def ply_element_count(file_path, element_name):
+    """Retourne le nombre d'éléments element_name déclarés dans l'en-tête."""
+    _, elements, _ = read_ply_header(file_path)
+    return next((count for name, count, _ in elements if name == element_name), 0)
+
+def ply_binary_element(file_path, element_name):
+    """Projette un élément d'un PLY binaire en np.memmap structuré, sans rien lire ; les listes doivent être des triangles."""
+    ply_format, elements, header_length = read_ply_header(file_path)
+    if ply_format == "ascii":
+        raise ValueError(f"{file_path} est en ASCII : convertissez-le avec convert_ply_to_binary")
+    byte_order = PLY_BYTE_ORDERS[ply_format]
+    offset = header_length
+    for name, count, properties in elements:
+        dtype = element_dtype(properties, byte_order, list_length=3)
+        if name == element_name:
+            return np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+        if any(len(prop) == 3 for prop in properties):
+            raise ValueError(f"Élément PLY '{name}' de taille variable avant '{element_name}'")
+        offset += count * dtype.itemsize
+    raise ValueError(f"Élément PLY '{element_name}' absent de {file_path}")
+
+def element_rows_to_array(block, element_name, names=None, dtype=np.float64):
+    """Extrait les coordonnées (n,3), au type dtype, d'un bloc de sommets ou les indices (n,3) d'un bloc de faces."""
+    if element_name == "vertex":
+        if names is None:
+            return np.column_stack([block["x"], block["y"], block["z"]]).astype(dtype, copy=False)
+        return block[:, [names.index("x"), names.index("y"), names.index("z")]].astype(dtype)
+    if names is None:
+        list_name = next(name for name in block.dtype.names if name + "_count" in block.dtype.names)
+        if np.any(block[list_name + "_count"] != 3):
+            raise ValueError("La lecture par blocs ne prend en charge que des faces triangulaires")
+        return np.asarray(block[list_name], dtype=np.int32)
+    if np.any(block[:, 0] != 3):
+        raise ValueError("La lecture par blocs ne prend en charge que des faces triangulaires")
+    return block[:, 1:4].astype(np.int32)
+
+def iter_ply_chunks(file_path, element_name, chunk_size):
+    """Parcourt les sommets ou les faces d'un PLY par blocs d'au plus chunk_size éléments, sans charger le fichier entier."""
+    ply_format, elements, header_length = read_ply_header(file_path)
+    if ply_format != "ascii":
+        block = ply_binary_element(file_path, element_name)
+        for start in range(0, len(block), chunk_size):
+            yield element_rows_to_array(block[start:start + chunk_size], element_name)
+        return
+
+    # En ASCII, chaque élément occupe exactement une ligne
+    with open(file_path, "rb") as file:
+        file.seek(header_length)
+        for name, count, properties in elements:
+            if name != element_name:
+                for _ in range(count):
+                    file.readline()
+                continue
+            names = [prop[0] for prop in properties]
+            for start in range(0, count, chunk_size):
+                lines = [file.readline() for _ in range(min(chunk_size, count - start))]
+                yield element_rows_to_array(np.array(b" ".join(lines).split(), dtype=np.float64).reshape(len(lines), -1), element_name, names)
+            return
@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import pyray as pr
+import numpy as np
+
+# Nombre d'images conservées pour les moyennes et percentiles glissants
+PROFILER_WINDOW = 120
+
+# Touche qui affiche ou masque le panneau de profilage
+PROFILER_TOGGLE_KEY = pr.KEY_F3
+
+# Variable d'environnement : fichier (.csv ou .json) où écrire les mesures de chaque image à la fermeture
+PROFILE_OUTPUT_VARIABLE = "TP3_PROFILE_OUTPUT"
+
+class FrameProfiler:
+    """Mesure la durée de blocs nommés à chaque image et tient des statistiques glissantes par étape."""
+
+    def __init__(self, window=PROFILER_WINDOW, record=False, output_path=None):
+        self.window = window
+        self.record = record or output_path is not None
+        self.output_path = output_path
+        self.history = {}  # étape -> deque des durées (s) des dernières images
+        self.frames = []  # toutes les images, seulement si record
+        self.current = {}
+        self.scope_starts = {}
+        self.frame_start = None
+        self.visible = False
+
+    @classmethod
+    def from_environment(cls, window=PROFILER_WINDOW):
+        """Crée un profileur qui enregistre toutes les images si la variable TP3_PROFILE_OUTPUT désigne un fichier."""
+        return cls(window, output_path=os.environ.get(PROFILE_OUTPUT_VARIABLE) or None)
+
+    def begin_frame(self):
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """Clôt l'image : la durée totale est enregistrée sous l'étape "image"."""
+        self.current["image"] = time.perf_counter() - self.frame_start
+        # Une étape sautée pendant cette image (rien à recalculer) compte pour zéro dans les moyennes
+        for name in self.history:
+            self.current.setdefault(name, 0.0)
+        for name, duration in self.current.items():
+            self.history.setdefault(name, deque(maxlen=self.window)).append(duration)
+        if self.record:
+            self.frames.append(self.current)
+
+    def begin_scope(self, name):
+        """Démarre la mesure de l'étape name ; à refermer par end_scope(name)."""
+        self.scope_starts[name] = time.perf_counter()
+
+    def end_scope(self, name):
+        """Arrête la mesure de l'étape name et ajoute sa durée à l'image en cours."""
+        self.current[name] = self.current.get(name, 0.0) + time.perf_counter() - self.scope_starts.pop(name)
+
+    @contextmanager
+    def scope(self, name):
+        """Mesure la durée du bloc et l'ajoute à l'étape name de l'image en cours."""
+        self.begin_scope(name)
+        try:
+            yield
+        finally:
+            self.end_scope(name)
+
+    def statistics(self):
+        """Retourne, pour chaque étape, la moyenne et les percentiles 50/95/99 (en ms) sur la fenêtre glissante."""
+        result = {}
+        for name, durations in self.history.items():
+            values = np.array(durations) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[name] = {"mean_ms": values.mean(), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+        return result
+
+    def handle_toggle(self, key=PROFILER_TOGGLE_KEY):
+        """Affiche ou masque le panneau quand la touche est pressée."""
+        if pr.is_key_pressed(key):
+            self.visible = not self.visible
+
+    def draw_overlay(self, x=10, y=10, font_size=16):
+        """Dessine le panneau des statistiques par étape s'il est visible."""
+        if not self.visible:
+            return
+        lines = [f"{'étape':<16}{'moy':>8}{'p50':>8}{'p95':>8}{'p99':>8}  (ms)"]
+        for name, stats in self.statistics().items():
+            lines.append(f"{name:<16}{stats['mean_ms']:8.2f}{stats['p50_ms']:8.2f}{stats['p95_ms']:8.2f}{stats['p99_ms']:8.2f}")
+        line_height = font_size + 4
+        pr.draw_rectangle(x - 5, y - 5, 62 * font_size // 2, line_height * len(lines) + 10, pr.fade(pr.BLACK, 0.7))
+        for index, line in enumerate(lines):
+            pr.draw_text(line, x, y + index * line_height, font_size, pr.RAYWHITE)
+
+    def stage_names(self):
+        """Retourne les étapes rencontrées dans les images enregistrées, dans leur ordre d'apparition."""
+        names = {}
+        for frame in self.frames:
+            names.update(dict.fromkeys(frame))
+        return list(names)
+
+    def dump_csv(self, path):
+        """Écrit une ligne par image et une colonne par étape (durées en ms)."""
+        names = self.stage_names()
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame"] + [f"{name}_ms" for name in names])
+            for index, frame in enumerate(self.frames):
+                writer.writerow([index] + [f"{frame[name] * 1000:.4f}" if name in frame else "" for name in names])
+
+    def dump_json(self, path):
+        """Écrit les durées de chaque image (ms) et les statistiques de la fenêtre glissante."""
+        frames = [{name: duration * 1000 for name, duration in frame.items()} for frame in self.frames]
+        with open(path, "w") as file:
+            json.dump({"frames": frames, "statistics": self.statistics()}, file, indent=2, ensure_ascii=False)
+
+    def dump(self, path=None):
+        """Écrit les mesures enregistrées au format choisi par l'extension (.json, sinon CSV)."""
+        path = path or self.output_path
+        if path is None:
+            return
+        if path.endswith(".json"):
+            self.dump_json(path)
+        else:
+            self.dump_csv(path)
+
+def profile_scope(profiler, name):
+    """Retourne le bloc de mesure name du profileur, ou un bloc vide si aucun profileur n'est fourni."""
+    return nullcontext() if profiler is None else profiler.scope(name)
@@ -0,0 +1,265 @@
+import numpy as np
+
+from culling_functions import camera_view_projection
+from tp1_functions import cross_products, vectors_normalize
+
+# Direction (vers la lumière) de l'éclairage directionnel du rendu logiciel
+LIGHT_DIRECTION = vectors_normalize(np.array([[0.4, 1.0, 0.6]]))[0]
+
+# Part de lumière ambiante dans l'ombrage plat, le reste vient de l'éclairage directionnel
+AMBIENT_LIGHT = 0.35
+
+# Côté (en pixels) des tuiles testées d'un bloc contre les fonctions d'arête des grands triangles
+TILE_SIZE = 8
+
+# Nombre maximal de fragments candidats traités en un seul lot vectorisé
+FRAGMENT_BATCH = 1 << 22
+
+# Décalage de profondeur des lignes et des points, pour qu'ils restent visibles sur les faces qu'ils bordent
+LINE_DEPTH_BIAS = 1e-4
+
+# Cible du rendu logiciel en cours : quand elle est définie, draw_mesh, draw_plane et draw_vector_3 dessinent dans son image
+software_target = {"framebuffer": None, "view_projection": None}
+
+def color_array(color):
+    """Convertit une pr.Color ou un triplet (r, g, b) en tableau numpy (3,)."""
+    if hasattr(color, "r"):
+        return np.array([color.r, color.g, color.b], dtype=np.float64)
+    return np.asarray(color, dtype=np.float64)[:3]
+
+class FrameBuffer:
+    """Image couleur (H,W,3) en uint8 et tampon de profondeur (H,W) du rendu logiciel."""
+
+    def __init__(self, width, height, background=(245, 245, 245)):
+        self.width = width
+        self.height = height
+        self.background = color_array(background).astype(np.uint8)
+        self.color = np.empty((height, width, 3), dtype=np.uint8)
+        self.depth = np.empty((height, width), dtype=np.float32)
+        self.clear()
+
+    def clear(self):
+        """Remplit l'image avec la couleur de fond et remet la profondeur à l'infini."""
+        self.color[:] = self.background
+        self.depth[:] = np.inf
+
+def begin_software_mode_3d(framebuffer, camera):
+    """Dirige les fonctions de dessin vers le FrameBuffer, vu par la pr.Camera3D (équivalent logiciel de pr.begin_mode_3d)."""
+    software_target["framebuffer"] = framebuffer
+    software_target["view_projection"] = camera_view_projection(camera, framebuffer.width / framebuffer.height)
+
+def end_software_mode_3d():
+    """Rend les fonctions de dessin à raylib."""
+    software_target["framebuffer"] = None
+    software_target["view_projection"] = None
+
+def software_mode_active():
+    """Indique si les fonctions de dessin visent actuellement un FrameBuffer."""
+    return software_target["framebuffer"] is not None
+
+def project_to_screen(points, view_projection, width, height):
+    """Projette des points (N,3) en coordonnées écran (N,3) : x, y en pixels (y vers le bas) et profondeur normalisée ; retourne aussi w.
+
+    La matrice suit la convention de perspective_projection_matrix : vecteurs colonnes puis division par w.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    clip = points @ view_projection[:3, :3].T + view_projection[:3, 3]
+    w = points @ view_projection[3, :3] + view_projection[3, 3]
+    safe_w = np.where(np.abs(w) > 1e-12, w, 1e-12)
+    screen = np.empty_like(clip)
+    screen[:, 0] = (clip[:, 0] / safe_w + 1) * 0.5 * width
+    screen[:, 1] = (1 - clip[:, 1] / safe_w) * 0.5 * height
+    screen[:, 2] = clip[:, 2] / safe_w
+    return screen, w
+
+def flat_shading(triangles, color, light_direction=LIGHT_DIRECTION):
+    """Calcule la couleur (T,3) de chaque triangle (T,3,3) en espace monde par un éclairage de Lambert double face."""
+    normals = vectors_normalize(cross_products(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]))
+    intensity = AMBIENT_LIGHT + (1 - AMBIENT_LIGHT) * np.abs(normals @ light_direction)
+    return np.clip(intensity[:, np.newaxis] * color_array(color), 0, 255)
+
+def triangle_setup(screen_triangles, width, height):
+    """Prépare tous les triangles écran (T,3,3) d'un coup : fonctions d'arête normalisées, plan de profondeur et boîte de pixels.
+
+    Retourne les indices des triangles conservés, les coefficients (K,3,3) des arêtes (a, b, c tels que a*x + b*y + c
+    soit la coordonnée barycentrique du sommet opposé), le plan de profondeur (K,3) et les boîtes (K,4) x0, y0, x1, y1 inclusives.
+    """
+    x, y, z = screen_triangles[:, :, 0], screen_triangles[:, :, 1], screen_triangles[:, :, 2]
+    x1, y1 = np.roll(x, -1, axis=1), np.roll(y, -1, axis=1)
+    x2, y2 = np.roll(x, -2, axis=1), np.roll(y, -2, axis=1)
+    area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (y[:, 1] - y[:, 0]) * (x[:, 2] - x[:, 0])
+
+    # Seuls les centres de pixels (i + 0.5) contenus dans la boîte englobante sont candidats
+    boxes = np.stack((
+        np.ceil(x.min(axis=1) - 0.5), np.ceil(y.min(axis=1) - 0.5),
+        np.floor(x.max(axis=1) - 0.5), np.floor(y.max(axis=1) - 0.5),
+    ), axis=1)
+    with np.errstate(invalid="ignore"):
+        boxes = np.clip(boxes, 0, [width - 1, height - 1, width - 1, height - 1])
+        kept = np.nonzero(
+            (area != 0) & np.isfinite(area) & (boxes[:, 0] <= boxes[:, 2]) & (boxes[:, 1] <= boxes[:, 3])
+            & (x.min(axis=1) < width) & (x.max(axis=1) > 0) & (y.min(axis=1) < height) & (y.max(axis=1) > 0)
+        )[0]
+
+    area = area[kept, np.newaxis]
+    a = (y1[kept] - y2[kept]) / area
+    b = (x2[kept] - x1[kept]) / area
+    c = -(a * x1[kept] + b * y1[kept])
+    edges = np.stack((a, b, c), axis=2)
+    depth_plane = np.einsum("kij,ki->kj", edges, z[kept])
+    return kept, edges, depth_plane, boxes[kept].astype(np.int64)
+
+def expand_rectangles(x0, y0, widths, heights):
+    """Énumère les pixels de rectangles (N,) ; retourne l'indice du rectangle et les coordonnées x, y de chaque pixel."""
+    counts = widths * heights
+    owners = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, x0[owners] + local % widths[owners], y0[owners] + local // widths[owners]
+
+def covered_tiles(edges, boxes):
+    """Énumère les tuiles TILE_SIZE² qui recoupent chaque grand triangle et écarte celles entièrement hors d'une arête."""
+    tile_boxes = boxes // TILE_SIZE
+    owners, tile_x, tile_y = expand_rectangles(
+        tile_boxes[:, 0], tile_boxes[:, 1], tile_boxes[:, 2] - tile_boxes[:, 0] + 1, tile_boxes[:, 3] - tile_boxes[:, 1] + 1
+    )
+    # Centres de pixels extrêmes de la tuile, restreints à la boîte du triangle
+    left = np.maximum(tile_x * TILE_SIZE, boxes[owners, 0]) + 0.5
+    right = np.minimum(tile_x * TILE_SIZE + TILE_SIZE - 1, boxes[owners, 2]) + 0.5
+    top = np.maximum(tile_y * TILE_SIZE, boxes[owners, 1]) + 0.5
+    bottom = np.minimum(tile_y * TILE_SIZE + TILE_SIZE - 1, boxes[owners, 3]) + 0.5
+
+    # Une arête rejette la tuile si elle est négative même au coin le plus favorable
+    owner_edges = edges[owners]
+    best_x = np.where(owner_edges[:, :, 0] > 0, right[:, np.newaxis], left[:, np.newaxis])
+    best_y = np.where(owner_edges[:, :, 1] > 0, bottom[:, np.newaxis], top[:, np.newaxis])
+    reachable = np.all(owner_edges[:, :, 0] * best_x + owner_edges[:, :, 1] * best_y + owner_edges[:, :, 2] >= 0, axis=1)
+    return (
+        owners[reachable], (left[reachable] - 0.5).astype(np.int64), (top[reachable] - 0.5).astype(np.int64),
+        (right - left)[reachable].astype(np.int64) + 1, (bottom - top)[reachable].astype(np.int64) + 1,
+    )
+
+def write_fragments(framebuffer, pixels, depths, colors):
+    """Résout la profondeur de fragments (indices de pixels aplatis) puis écrit la couleur des plus proches."""
+    depth = framebuffer.depth.reshape(-1)
+    depths = depths.astype(np.float32)
+    np.minimum.at(depth, pixels, depths)
+    nearest = depths <= depth[pixels]
+    framebuffer.color.reshape(-1, 3)[pixels[nearest]] = colors[nearest]
+
+def rasterize_batch(framebuffer, edges, depth_plane, colors, owners, px, py):
+    """Teste les fragments candidats (triangle, x, y) contre les fonctions d'arête et la profondeur, puis les écrit."""
+    centers_x, centers_y = px + 0.5, py + 0.5
+    owner_edges = edges[owners]
+    weights = owner_edges[:, :, 0] * centers_x[:, np.newaxis] + owner_edges[:, :, 1] * centers_y[:, np.newaxis] + owner_edges[:, :, 2]
+    plane = depth_plane[owners]
+    depths = plane[:, 0] * centers_x + plane[:, 1] * centers_y + plane[:, 2]
+    inside = np.all(weights >= 0, axis=1) & (depths >= -1) & (depths <= 1)
+    write_fragments(framebuffer, (py * framebuffer.width + px)[inside], depths[inside], colors[owners[inside]])
+
+def rasterize_triangles(framebuffer, screen_triangles, colors):
+    """Remplit les triangles écran (T,3,3) avec leurs couleurs (T,3) : préparation groupée, couverture par tuiles et z-buffer."""
+    kept, edges, depth_plane, boxes = triangle_setup(np.asarray(screen_triangles, dtype=np.float64), framebuffer.width, framebuffer.height)
+    if len(kept) == 0:
+        return
+    colors = np.asarray(colors)[kept].astype(np.uint8)
+    widths, heights = boxes[:, 2] - boxes[:, 0] + 1, boxes[:, 3] - boxes[:, 1] + 1
+
+    # Les petits triangles énumèrent directement leur boîte ; les grands passent d'abord par le rejet des tuiles vides
+    small = widths * heights <= TILE_SIZE * TILE_SIZE
+    candidates = np.where(small, widths * heights, 0)
+    if not small.all():
+        large = np.nonzero(~small)[0]
+        tile_owners, tile_x, tile_y, tile_widths, tile_heights = covered_tiles(edges[large], boxes[large])
+        np.add.at(candidates, large[tile_owners], tile_widths * tile_heights)
+
+    # Découper en lots de triangles consécutifs d'environ FRAGMENT_BATCH fragments candidats
+    if not small.all():
+        tile_triangles = large[tile_owners]
+    batch_ids = np.cumsum(candidates) // FRAGMENT_BATCH
+    for batch in np.unique(batch_ids):
+        selection = np.nonzero(batch_ids == batch)[0]
+        in_small = selection[small[selection]]
+        owners, px, py = expand_rectangles(boxes[in_small, 0], boxes[in_small, 1], widths[in_small], heights[in_small])
+        owners = in_small[owners]
+        if not small.all():
+            in_batch = (tile_triangles >= selection[0]) & (tile_triangles <= selection[-1])
+            tile_rect_owners, tile_px, tile_py = expand_rectangles(
+                tile_x[in_batch], tile_y[in_batch], tile_widths[in_batch], tile_heights[in_batch]
+            )
+            owners = np.concatenate((owners, tile_triangles[in_batch][tile_rect_owners]))
+            px, py = np.concatenate((px, tile_px)), np.concatenate((py, tile_py))
+        rasterize_batch(framebuffer, edges, depth_plane, colors, owners, px, py)
+
+def rasterize_lines(framebuffer, screen_starts, screen_ends, color):
+    """Trace des segments écran (N,3) d'une couleur, échantillonnés pixel par pixel avec test de profondeur."""
+    delta = screen_ends - screen_starts
+    steps = np.ceil(np.abs(delta[:, :2]).max(axis=1)).astype(np.int64)
+    steps = np.clip(steps, 1, 4 * (framebuffer.width + framebuffer.height)) + 1
+    owners = np.repeat(np.arange(len(steps)), steps)
+    t = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / (steps[owners] - 1)
+    points = screen_starts[owners] + t[:, np.newaxis] * delta[owners]
+    rasterize_points(framebuffer, points, color)
+
+def rasterize_points(framebuffer, screen_points, color, size=1):
+    """Dessine des points écran (N,3) sous forme de carrés de size pixels, avec test de profondeur."""
+    offsets = np.arange(size) - size // 2
+    px = (np.floor(screen_points[:, 0])[:, np.newaxis, np.newaxis] + offsets[np.newaxis, :]).astype(np.int64)
+    py = (np.floor(screen_points[:, 1])[:, np.newaxis, np.newaxis] + offsets[:, np.newaxis]).astype(np.int64)
+    px, py = np.broadcast_arrays(px, py)
+    depths = np.broadcast_to((screen_points[:, 2] - LINE_DEPTH_BIAS)[:, np.newaxis, np.newaxis], px.shape)
+    px, py, depths = px.reshape(-1), py.reshape(-1), depths.reshape(-1)
+    inside = (px >= 0) & (px < framebuffer.width) & (py >= 0) & (py < framebuffer.height) & (depths >= -1) & (depths <= 1)
+    colors = np.broadcast_to(color_array(color).astype(np.uint8), (int(inside.sum()), 3))
+    write_fragments(framebuffer, (py * framebuffer.width + px)[inside], depths[inside], colors)
+
+def render_triangles(framebuffer, view_projection, triangles, color):
+    """Projette, ombre et rastérise des triangles (T,3,3) en espace monde."""
+    triangles = np.asarray(triangles, dtype=np.float64)
+    if len(triangles) == 0:
+        return
+    screen, w = project_to_screen(triangles.reshape(-1, 3), view_projection, framebuffer.width, framebuffer.height)
+    # Les triangles qui passent derrière la caméra sont écartés plutôt que découpés
+    in_front = np.all(w.reshape(-1, 3) > 0, axis=1)
+    rasterize_triangles(framebuffer, screen.reshape(-1, 3, 3)[in_front], flat_shading(triangles[in_front], color))
+
+def render_lines(framebuffer, view_projection, starts, ends, color):
+    """Projette et trace des segments (N,3) en espace monde."""
+    starts, ends = np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64)
+    if len(starts) == 0:
+        return
+    screen, w = project_to_screen(np.concatenate((starts, ends)), view_projection, framebuffer.width, framebuffer.height)
+    in_front = (w[:len(starts)] > 0) & (w[len(starts):] > 0)
+    rasterize_lines(framebuffer, screen[:len(starts)][in_front], screen[len(starts):][in_front], color)
+
+def render_points(framebuffer, view_projection, points, color, size=3):
+    """Projette et dessine des points (N,3) en espace monde."""
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) == 0:
+        return
+    screen, w = project_to_screen(points, view_projection, framebuffer.width, framebuffer.height)
+    rasterize_points(framebuffer, screen[w > 0], color, size)
+
+def draw_mesh_instances(framebuffer, vertices, faces, transforms, view_projection, color):
+    """Dessine toutes les instances (K,4,4) d'un mesh en ombrage plat dans le FrameBuffer."""
+    transforms = np.asarray(transforms, dtype=np.float64)
+    if len(transforms) == 0 or len(faces) == 0:
+        return
+    vertices = np.asarray(vertices, dtype=np.float64)
+    world = vertices @ transforms[:, :3, :3].transpose(0, 2, 1) + transforms[:, np.newaxis, :3, 3]
+    render_triangles(framebuffer, view_projection, world[:, faces].reshape(-1, 3, 3), color)
+
+def draw_software_triangles(triangles, color):
+    """Dessine des triangles (T,3,3) dans la cible logicielle active."""
+    render_triangles(software_target["framebuffer"], software_target["view_projection"], triangles, color)
+
+def draw_software_instances(vertices, faces, transforms, color):
+    """Dessine les instances (K,4,4) d'un mesh dans la cible logicielle active."""
+    draw_mesh_instances(software_target["framebuffer"], vertices, faces, transforms, software_target["view_projection"], color)
+
+def draw_software_lines(starts, ends, color):
+    """Trace des segments (N,3) dans la cible logicielle active."""
+    render_lines(software_target["framebuffer"], software_target["view_projection"], starts, ends, color)
+
+def draw_software_points(points, color, size=3):
+    """Dessine des points (N,3) dans la cible logicielle active."""
+    render_points(software_target["framebuffer"], software_target["view_projection"], points, color, size)
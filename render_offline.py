@@ -0,0 +1,58 @@
+"""Rend les scènes des exercices hors ligne, sans fenêtre, à pas de temps fixe.
+
+Exemples depuis la racine du dépôt :
+    python render_offline.py exo2 --frames 120 --fps 30 --png renders/exo2
+    python render_offline.py exo2 --frames 600 --workers 8 --png renders/exo2
+    python render_offline.py exo1 --frames 300 --raw /dev/null --profile exo1_timings.csv
+    python render_offline.py exo3 --frames 300 --raw - | ffmpeg -f rawvideo -pix_fmt rgb24 -s 1000x900 -r 30 -i - exo3.mp4
+"""
+import argparse
+import time
+
+import pyray as pr
+
+from offline_functions import SCENES, PngFrameWriter, RawVideoWriter, create_scene, render_animation
+from parallel_functions import DEFAULT_CHUNK_FRAMES, render_animation_parallel
+from profiling_functions import FrameProfiler
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendu logiciel hors ligne des scènes du TP.")
+    parser.add_argument("scene", choices=sorted(SCENES), help="scène à rendre")
+    parser.add_argument("--frames", type=int, default=60, help="nombre d'images")
+    parser.add_argument("--fps", type=float, default=30.0, help="images par seconde (pas de temps 1/fps)")
+    parser.add_argument("--start", type=float, default=0.0, help="instant de la première image (s)")
+    parser.add_argument("--width", type=int, default=1000, help="largeur des images")
+    parser.add_argument("--height", type=int, default=900, help="hauteur des images")
+    parser.add_argument("--workers", type=int, default=0, help="nombre de processus (0 = tous les cœurs, 1 = rendu séquentiel)")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK_FRAMES, help="images rendues par tâche en mode parallèle")
+    parser.add_argument("--profile", metavar="FICHIER", help="écrire la durée de chaque image en CSV ou JSON (.json) ; rendu séquentiel")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--png", metavar="DOSSIER", help="écrire une image PNG par frame dans ce dossier")
+    output.add_argument("--raw", metavar="FICHIER", help="écrire une vidéo RGB24 brute (\"-\" pour la sortie standard)")
+    args = parser.parse_args()
+
+    pr.set_trace_log_level(pr.LOG_WARNING)
+    writer = PngFrameWriter(args.png) if args.png else RawVideoWriter(args.raw)
+    profiler = FrameProfiler(output_path=args.profile) if args.profile else None
+    started = time.perf_counter()
+    try:
+        # Les mesures par image n'ont de sens que dans un seul processus : --profile impose le rendu séquentiel
+        if args.workers == 1 or profiler is not None:
+            render_animation(
+                create_scene(args.scene), args.frames, args.fps, writer, args.width, args.height, args.start, profiler=profiler
+            )
+        else:
+            render_animation_parallel(
+                args.scene, args.frames, args.fps, writer, args.width, args.height, args.start,
+                workers=args.workers or None, chunk_frames=args.chunk
+            )
+    finally:
+        writer.close()
+    if profiler is not None:
+        profiler.dump()
+    elapsed = time.perf_counter() - started
+    if args.raw != "-":
+        print(f"{args.frames} images en {elapsed:.2f} s ({args.frames / elapsed:.1f} images/s)")
+
+if __name__ == "__main__":
+    main()
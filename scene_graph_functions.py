@@ -0,0 +1,81 @@
+import numpy as np
+
+class SceneGraph:
+    """Graphe de scène stocké en tableaux : transformations locales, liens de parenté et matrices monde mises en cache.
+
+    Les nœuds sont désignés par leur indice. Seuls les nœuds modifiés et leurs descendants sont recalculés,
+    niveau par niveau, avec un seul produit matriciel par niveau.
+    """
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.parents = np.full(capacity, -1, dtype=np.int64)
+        self.depths = np.zeros(capacity, dtype=np.int64)
+        self.local = np.tile(np.eye(4), (capacity, 1, 1))
+        self.world = np.tile(np.eye(4), (capacity, 1, 1))
+        self.dirty = np.zeros(capacity, dtype=bool)
+        self.levels = None
+
+    def reserve(self, capacity):
+        """Agrandit les tableaux pour accueillir au moins capacity nœuds."""
+        if capacity <= len(self.parents):
+            return
+        capacity = max(capacity, 2 * len(self.parents))
+        extra = capacity - len(self.parents)
+        self.parents = np.concatenate((self.parents, np.full(extra, -1, dtype=np.int64)))
+        self.depths = np.concatenate((self.depths, np.zeros(extra, dtype=np.int64)))
+        self.local = np.concatenate((self.local, np.tile(np.eye(4), (extra, 1, 1))))
+        self.world = np.concatenate((self.world, np.tile(np.eye(4), (extra, 1, 1))))
+        self.dirty = np.concatenate((self.dirty, np.zeros(extra, dtype=bool)))
+
+    def add_nodes(self, parent, count, local=None):
+        """Ajoute count nœuds enfants de parent (-1 pour des racines) et retourne leurs indices."""
+        self.reserve(self.count + count)
+        indices = np.arange(self.count, self.count + count)
+        self.parents[indices] = parent
+        self.depths[indices] = 0 if parent < 0 else self.depths[parent] + 1
+        if local is not None:
+            self.local[indices] = local
+        self.dirty[indices] = True
+        self.count += count
+        self.levels = None  # La structure a changé : regroupement par profondeur à refaire
+        return indices
+
+    def add_node(self, parent=-1, local=None):
+        """Ajoute un nœud enfant de parent (-1 pour une racine) et retourne son indice."""
+        return int(self.add_nodes(parent, 1, None if local is None else np.asarray(local)[np.newaxis])[0])
+
+    def set_local(self, node, local):
+        """Change la transformation locale d'un nœud ; il n'est marqué modifié que si la matrice diffère."""
+        if not np.array_equal(self.local[node], local):
+            self.local[node] = local
+            self.dirty[node] = True
+
+    def set_locals(self, nodes, locals_):
+        """Change les transformations locales (K,4,4) de plusieurs nœuds et les marque modifiés."""
+        self.local[nodes] = locals_
+        self.dirty[nodes] = True
+
+    def depth_levels(self):
+        """Retourne les indices des nœuds regroupés par profondeur, recalculés seulement après un ajout."""
+        if self.levels is None:
+            depths = self.depths[:self.count]
+            order = np.argsort(depths, kind="stable")
+            bounds = np.searchsorted(depths[order], np.arange(depths.max(initial=-1) + 2))
+            self.levels = [order[bounds[d]:bounds[d + 1]] for d in range(len(bounds) - 1)]
+        return self.levels
+
+    def update(self):
+        """Recalcule les matrices monde des nœuds modifiés et de leurs descendants ; retourne le nombre de nœuds recalculés."""
+        updated = np.zeros(self.count, dtype=bool)
+        for depth, nodes in enumerate(self.depth_levels()):
+            if depth == 0:
+                stale = nodes[self.dirty[nodes]]
+                self.world[stale] = self.local[stale]
+            else:
+                # Un nœud est à recalculer s'il a changé ou si son parent vient d'être recalculé
+                stale = nodes[self.dirty[nodes] | updated[self.parents[nodes]]]
+                self.world[stale] = np.take(self.world, self.parents[stale], axis=0) @ np.take(self.local, stale, axis=0)
+            updated[stale] = True
+        self.dirty[:self.count] = False
+        return int(updated.sum())
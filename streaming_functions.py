@@ -0,0 +1,59 @@
+import numpy as np
+
+from ply_functions import (
+    binary_ply_header,
+    iter_ply_chunks,
+    ply_binary_element,
+    ply_element_count,
+    triangle_records,
+)
+from tp3_exo1 import apply_transformations_batch, compose_transformations
+
+# Nombre d'éléments lus par bloc : borne la mémoire de pointe indépendamment de la taille du mesh
+DEFAULT_CHUNK_SIZE = 1 << 18
+
+class ChunkTransformer:
+    """Applique une matrice 4x4 à des blocs de sommets en réutilisant les mêmes tampons d'un bloc à l'autre."""
+
+    def __init__(self, transform, chunk_size):
+        self.transform = np.asarray(transform)[np.newaxis]
+        self.homogeneous = np.ones((chunk_size, 4))
+        self.work = np.empty((1, chunk_size, 4))
+        self.out = np.empty((1, chunk_size, 3))
+
+    def __call__(self, vertices):
+        """Retourne les sommets transformés (vue sur le tampon de sortie, valide jusqu'au bloc suivant)."""
+        count = len(vertices)
+        self.homogeneous[:count, :3] = vertices
+        return apply_transformations_batch(
+            self.homogeneous[:count], self.transform, out=self.out[:, :count], work=self.work[:, :count]
+        )[0]
+
+def iter_transformed_vertex_chunks(file_path, transform, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Parcourt les sommets d'un PLY par blocs en leur appliquant la matrice homogène transform."""
+    transformer = ChunkTransformer(transform, chunk_size)
+    for vertices in iter_ply_chunks(file_path, "vertex", chunk_size):
+        yield transformer(vertices)
+
+def iter_transformed_face_chunks(file_path, transform, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Parcourt les faces d'un PLY binaire par blocs ; chaque bloc est un petit mesh (sommets transformés, faces locales) prêt à dessiner."""
+    vertex_block = ply_binary_element(file_path, "vertex")
+    transformer = ChunkTransformer(transform, 3 * chunk_size)
+    for faces in iter_ply_chunks(file_path, "face", chunk_size):
+        # Seuls les sommets référencés par le bloc sont lus dans le fichier projeté en mémoire
+        used, local_faces = np.unique(faces, return_inverse=True)
+        records = vertex_block[used]
+        vertices = np.column_stack([records["x"], records["y"], records["z"]])
+        yield transformer(vertices), local_faces.reshape(-1, 3).astype(np.int32)
+
+def transform_ply_file(source_path, destination_path, translation_mat, rotation_mat, scaling_mat, projection_mat, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Transforme un PLY bloc par bloc et écrit le résultat en PLY binaire, avec une mémoire bornée par chunk_size."""
+    transform = compose_transformations(translation_mat, rotation_mat, scaling_mat, projection_mat)
+    vertex_count = ply_element_count(source_path, "vertex")
+    face_count = ply_element_count(source_path, "face")
+    with open(destination_path, "wb") as file:
+        file.write(binary_ply_header(vertex_count, face_count))
+        for vertices in iter_transformed_vertex_chunks(source_path, transform, chunk_size):
+            file.write(np.ascontiguousarray(vertices, dtype="<f4").tobytes())
+        for faces in iter_ply_chunks(source_path, "face", chunk_size):
+            file.write(triangle_records(faces).tobytes())
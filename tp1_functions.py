@@ -1,5 +1,6 @@
 from pyray import Vector3
 import math
+import numpy as np
 
 def cross_product(A, B):
     """Calcule le produit croisé entre deux vecteurs A et B."""
@@ -24,3 +25,30 @@ def vector_normalize(vector):
 def dot_product(A, B):
     """Calcule le produit scalaire entre deux vecteurs A et B."""
     return A.x*B.x + A.y*B.y + A.z*B.z
+
+
+def as_vector_array(vectors):
+    """Convertit un Vector3, une liste de Vector3 ou un tableau en tableau numpy (N,3)."""
+    if hasattr(vectors, "x"):
+        vectors = [vectors]
+    if len(vectors) > 0 and hasattr(vectors[0], "x"):
+        vectors = [(v.x, v.y, v.z) for v in vectors]
+    return np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+
+def cross_products(A, B):
+    """Calcule les produits croisés ligne à ligne de deux ensembles de vecteurs (N,3)."""
+    return np.cross(as_vector_array(A), as_vector_array(B))
+
+def dot_products(A, B):
+    """Calcule les produits scalaires ligne à ligne de deux ensembles de vecteurs (N,3)."""
+    return np.einsum('ij,ij->i', as_vector_array(A), as_vector_array(B))
+
+def vector_lengths(vectors):
+    """Calcule la longueur de chaque vecteur d'un ensemble (N,3)."""
+    return np.linalg.norm(as_vector_array(vectors), axis=1)
+
+def vectors_normalize(vectors):
+    """Normalise chaque vecteur d'un ensemble (N,3) ; les vecteurs nuls restent inchangés comme dans vector_normalize."""
+    vectors = as_vector_array(vectors)
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, lengths, out=vectors.copy(), where=lengths > 0)
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import pyray as pr
 import numpy as np
 from pyray import Vector3
@@ -5,6 +7,13 @@ from pyray import Vector3
 from tp1_functions import *
 from basic_drawing_functions import *
 from mesh_functions import *
+from profiling_functions import FrameProfiler, profile_scope
+
+# Nombre de décimales conservées sur les paramètres (axe, angle, facteur) qui servent de clé au cache des matrices
+MATRIX_CACHE_DECIMALS = 6
+
+# Nombre de matrices gardées en cache ; les moins récemment utilisées sont évincées
+MATRIX_CACHE_SIZE = 256
 
 def rotation_matrix_homogeneous(axis, theta):
     """Génère une matrice homogène de rotation autour d'un axe arbitraire (4x4)."""
@@ -34,6 +43,30 @@ def rotation_matrix_homogeneous(axis, theta):
     
     return R4
 
+def rotation_matrices_homogeneous(axes, thetas, out=None):
+    """Génère N matrices homogènes de rotation (N,4,4) autour des axes (N,3) d'angles (N,), en une seule passe vectorisée."""
+    nx, ny, nz = vectors_normalize(axes).T
+    cos_theta = np.cos(thetas)
+    sin_theta = np.sin(thetas)
+    one_minus_cos = 1 - cos_theta
+    if out is None:
+        out = np.empty((len(cos_theta), 4, 4))
+
+    # Rodrigues : R = I*cos(θ) + (1-cos(θ))*n⊗n + K*sin(θ), développée terme à terme
+    out[:, 0, 0] = cos_theta + one_minus_cos * nx * nx
+    out[:, 0, 1] = one_minus_cos * nx * ny - sin_theta * nz
+    out[:, 0, 2] = one_minus_cos * nx * nz + sin_theta * ny
+    out[:, 1, 0] = one_minus_cos * ny * nx + sin_theta * nz
+    out[:, 1, 1] = cos_theta + one_minus_cos * ny * ny
+    out[:, 1, 2] = one_minus_cos * ny * nz - sin_theta * nx
+    out[:, 2, 0] = one_minus_cos * nz * nx - sin_theta * ny
+    out[:, 2, 1] = one_minus_cos * nz * ny + sin_theta * nx
+    out[:, 2, 2] = cos_theta + one_minus_cos * nz * nz
+    out[:, :3, 3] = 0
+    out[:, 3, :3] = 0
+    out[:, 3, 3] = 1
+    return out
+
 def scaling_matrix_homogeneous(axis, k):
     """Génère une matrice homogène de mise à l'échelle le long d'un axe arbitraire (4x4)."""
     axis = vector_normalize(axis)
@@ -53,6 +86,28 @@ def scaling_matrix_homogeneous(axis, k):
     
     return S4
 
+def write_axis_matrices(out, nx, ny, nz, diagonal, outer):
+    """Écrit dans out (N,4,4) les matrices homogènes I*diagonal + outer*n⊗n des axes normalisés (nx, ny, nz)."""
+    out[:, 0, 0] = diagonal + outer * nx * nx
+    out[:, 1, 1] = diagonal + outer * ny * ny
+    out[:, 2, 2] = diagonal + outer * nz * nz
+    # n⊗n est symétrique : chaque terme hors diagonale est calculé une seule fois
+    out[:, 0, 1] = out[:, 1, 0] = outer * nx * ny
+    out[:, 0, 2] = out[:, 2, 0] = outer * nx * nz
+    out[:, 1, 2] = out[:, 2, 1] = outer * ny * nz
+    out[:, :3, 3] = 0
+    out[:, 3, :3] = 0
+    out[:, 3, 3] = 1
+    return out
+
+def scaling_matrices_homogeneous(axes, factors, out=None):
+    """Génère N matrices homogènes de mise à l'échelle (N,4,4) le long des axes (N,3) de facteurs (N,), en une seule passe vectorisée."""
+    nx, ny, nz = vectors_normalize(axes).T
+    if out is None:
+        out = np.empty((len(nx), 4, 4))
+    # S = I + (k-1)*n⊗n
+    return write_axis_matrices(out, nx, ny, nz, 1.0, np.asarray(factors, dtype=np.float64) - 1)
+
 def translation_matrix(tx, ty, tz):
     """Génère une matrice homogène de translation (4x4)."""
     T = np.eye(4)
@@ -61,6 +116,15 @@ def translation_matrix(tx, ty, tz):
     T[2, 3] = tz
     return T
 
+def translation_matrices(translations, out=None):
+    """Génère N matrices homogènes de translation (N,4,4) à partir des vecteurs (N,3)."""
+    translations = as_vector_array(translations)
+    if out is None:
+        out = np.empty((len(translations), 4, 4))
+    out[:] = np.eye(4)
+    out[:, :3, 3] = translations
+    return out
+
 def orthographic_projection_matrix_homogeneous(axis):
     """Génère une matrice homogène de projection orthographique sur un plan normal à un axe donné (4x4)."""
     axis = vector_normalize(axis)
@@ -80,21 +144,146 @@ def orthographic_projection_matrix_homogeneous(axis):
     
     return P4
 
+def orthographic_projection_matrices_homogeneous(axes, out=None):
+    """Génère N matrices homogènes de projection orthographique (N,4,4) sur les plans normaux aux axes (N,3)."""
+    nx, ny, nz = vectors_normalize(axes).T
+    if out is None:
+        out = np.empty((len(nx), 4, 4))
+    # P = I - n⊗n
+    return write_axis_matrices(out, nx, ny, nz, 1.0, -1.0)
+
 def perspective_projection_matrix(d):
     """Génère une matrice homogène de projection en perspective avec une distance focale d."""
     P = np.eye(4)
     P[3, 2] = 1.0 / d  # Perspective division component
     return P
 
+def quantize_parameters(axis, *parameters):
+    """Retourne la clé de cache d'un axe (Vector3 ou 3 valeurs) et de paramètres scalaires, arrondis à MATRIX_CACHE_DECIMALS."""
+    if hasattr(axis, "x"):
+        axis = (axis.x, axis.y, axis.z)
+    # Floats Python plutôt que tableaux numpy : la clé est recalculée à chaque appel, y compris quand le cache répond
+    # + 0.0 confond -0.0 et 0.0, qui donneraient sinon deux clés pour la même matrice
+    return tuple([round(float(value), MATRIX_CACHE_DECIMALS) + 0.0 for value in (*axis, *parameters)])
+
+@lru_cache(maxsize=MATRIX_CACHE_SIZE)
+def cached_axis_matrix(kind, key):
+    """Construit une fois la matrice (4x4, lecture seule) de type kind pour la clé quantifiée key."""
+    axis, parameters = [key[:3]], key[3:]
+    if kind == "rotation":
+        matrix = rotation_matrices_homogeneous(axis, parameters)[0]
+    elif kind == "scaling":
+        matrix = scaling_matrices_homogeneous(axis, parameters)[0]
+    else:
+        matrix = orthographic_projection_matrices_homogeneous(axis)[0]
+    # Partagée entre tous les appelants : toute écriture accidentelle lève une erreur
+    matrix.setflags(write=False)
+    return matrix
+
+def cached_rotation_matrix(axis, theta):
+    """Version en cache de rotation_matrix_homogeneous pour les axes et angles qui se répètent d'une image à l'autre."""
+    return cached_axis_matrix("rotation", quantize_parameters(axis, theta))
+
+def cached_scaling_matrix(axis, k):
+    """Version en cache de scaling_matrix_homogeneous."""
+    return cached_axis_matrix("scaling", quantize_parameters(axis, k))
+
+def cached_orthographic_projection_matrix(axis):
+    """Version en cache de orthographic_projection_matrix_homogeneous."""
+    return cached_axis_matrix("orthographic", quantize_parameters(axis))
+
+def to_homogeneous(vertices, dtype=np.float64):
+    """Convertit des sommets (V,3) en coordonnées homogènes (V,4) avec w = 1."""
+    vertices_homogeneous = np.empty((vertices.shape[0], 4), dtype=dtype)
+    vertices_homogeneous[:, :3] = vertices
+    vertices_homogeneous[:, 3] = 1.0
+    return vertices_homogeneous
+
+def compose_transformations(translation_mat, rotation_mat, scaling_mat, projection_mat, out=None, work=None):
+    """Compose les matrices dans l'ordre d'application : translation, rotation, mise à l'échelle puis projection (accepte des piles (K,4,4))."""
+    if out is None:
+        return projection_mat @ scaling_mat @ rotation_mat @ translation_mat
+
+    # Produits alternés entre out et work pour ne rien allouer
+    np.matmul(rotation_mat, translation_mat, out=work)
+    np.matmul(scaling_mat, work, out=out)
+    np.matmul(projection_mat, out, out=work)
+    np.copyto(out, work)
+    return out
+
+def apply_transformations_batch(vertices_homogeneous, matrices, out=None, work=None):
+    """Applique K matrices 4x4 aux sommets homogènes (V,4) et écrit les K jeux de sommets 3D dans out (K,V,3)."""
+    matrices = np.asarray(matrices)
+    count = matrices.shape[0]
+    vertex_count = vertices_homogeneous.shape[0]
+    if out is None:
+        out = np.empty((count, vertex_count, 3), dtype=vertices_homogeneous.dtype)
+    if work is None:
+        work = np.empty((count, vertex_count, 4), dtype=vertices_homogeneous.dtype)
+
+    # Un seul produit matriciel pour toutes les instances : (V,4) @ (K,4,4)ᵀ -> (K,V,4)
+    np.matmul(vertices_homogeneous, matrices.transpose(0, 2, 1), out=work)
+    np.divide(work[..., :3], work[..., 3:], out=out)  # Revenir aux coordonnées 3D
+    return out
+
 def apply_transformations_homogeneous(mesh, translation_mat, rotation_mat, scaling_mat, projection_mat):
     """Applique les transformations de rotation, de mise à l'échelle et de projection aux sommets du mesh en utilisant des matrices 4x4."""
-    vertices_homogeneous = np.hstack((mesh.original_vertices, np.ones((mesh.original_vertices.shape[0], 1))))
-    transformed_vertices = vertices_homogeneous @ translation_mat.T @ rotation_mat.T @ scaling_mat.T @ projection_mat.T
-    mesh.vertices = transformed_vertices[:, :3] / transformed_vertices[:, 3, np.newaxis]  # Revenir aux coordonnées 3D
+    # La chaîne est précomposée en une seule matrice, stockée dans la précision du mesh
+    compose_transformations(translation_mat, rotation_mat, scaling_mat, projection_mat, out=mesh.transform_matrix[0], work=mesh.compose_work)
+    # Écriture en place dans le tampon de sommets : la topologie du mesh n'est pas invalidée
+    apply_transformations_batch(mesh.homogeneous_vertices, mesh.transform_matrix, out=mesh.vertices[np.newaxis], work=mesh.transform_work)
+
+def initialize_mesh_for_transforming(mesh, dtype=np.float64):
+    """Stocke les sommets originaux du mesh pour permettre un redimensionnement dynamique (dtype=np.float32 pour le mode compact)."""
+    # Les sommets originaux sont une vue sur la copie homogène : une seule copie en mémoire
+    mesh.homogeneous_vertices = to_homogeneous(mesh.vertices, dtype)
+    mesh.original_vertices = mesh.homogeneous_vertices[:, :3]
+    mesh.vertices = np.array(mesh.vertices, dtype=dtype)
 
-def initialize_mesh_for_transforming(mesh):
-    """Stocke les sommets originaux du mesh pour permettre un redimensionnement dynamique."""
-    mesh.original_vertices = np.copy(mesh.vertices)
+    # Tampons réutilisés à chaque image : aucune allocation dans le chemin de transformation
+    mesh.transform_matrix = np.eye(4, dtype=dtype)[np.newaxis]
+    mesh.compose_work = np.empty((4, 4), dtype=dtype)
+    mesh.transform_work = np.empty((1, mesh.original_vertices.shape[0], 4), dtype=dtype)
+
+class TransformState:
+    """Suit les curseurs de transformation et ne recompose la matrice du mesh que lorsqu'une de leurs valeurs change."""
+
+    def __init__(self, scale_factor_ptr, angle_ptr, axis_ptrs, translate_ptrs, projection_type_ptr, d_ptr):
+        self.pointers = (scale_factor_ptr, angle_ptr, *axis_ptrs, *translate_ptrs, projection_type_ptr, d_ptr)
+        self.values = None
+        self.axis = Vector3(axis_ptrs[0][0], axis_ptrs[1][0], axis_ptrs[2][0])
+
+    def compose(self):
+        """Construit les matrices de translation, rotation, mise à l'échelle et projection à partir des valeurs mémorisées."""
+        scale_factor, angle, axis_x, axis_y, axis_z, tx, ty, tz, projection_type, d = self.values
+        axis = Vector3(axis_x, axis_y, axis_z)
+
+        # Création des matrices de transformation ; les curseurs reviennent souvent aux mêmes valeurs
+        rotation_mat = cached_rotation_matrix(axis, np.radians(angle))
+        scaling_mat = cached_scaling_matrix(axis, scale_factor)
+        translation_mat = translation_matrix(tx, ty, tz)
+
+        # Choix de la projection
+        projection_mat = np.eye(4)
+        if projection_type > -1 and projection_type < 1:
+            projection_mat = cached_orthographic_projection_matrix(axis)
+        elif projection_type == 1:
+            projection_mat = perspective_projection_matrix(d)
+        return translation_mat, rotation_mat, scaling_mat, projection_mat
+
+    def update(self, mesh, profiler=None):
+        """Retransforme le mesh si un curseur a bougé depuis l'image précédente ; retourne True dans ce cas."""
+        values = tuple(ptr[0] for ptr in self.pointers)
+        if values == self.values:
+            return False
+
+        self.values = values
+        self.axis = Vector3(values[2], values[3], values[4])
+        with profile_scope(profiler, "matrices"):
+            matrices = self.compose()
+        with profile_scope(profiler, "transformations"):
+            apply_transformations_homogeneous(mesh, *matrices)
+        return True
 
 def main():
     pr.init_window(1000, 900, "Visionneuse 3D avec contrôle de rotation, de mise à l'échelle et de projection")
@@ -106,7 +295,8 @@ def main():
     # Chargement du mesh et initialisation des transformations
     ply_file_path = "cube.ply"
     mesh = load_ply_file(ply_file_path)
-    initialize_mesh_for_transforming(mesh)
+    initialize_mesh_for_transforming(mesh, dtype=np.float32)
+    renderer = MeshRenderer(mesh)
 
     # Contrôles d'interface pour les transformations et translations
     scale_factor_ptr = pr.ffi.new('float *', 1.0)
@@ -121,44 +311,45 @@ def main():
     d_ptr = pr.ffi.new('float *', 1.0)       # Paramètre de distance pour la projection en perspective
     projection_type_ptr = pr.ffi.new('float *', -1)  # Valeur par défaut (aucune projection)
 
+    transform_state = TransformState(
+        scale_factor_ptr,
+        angle_ptr,
+        (axis_x_ptr, axis_y_ptr, axis_z_ptr),
+        (translate_x_ptr, translate_y_ptr, translate_z_ptr),
+        projection_type_ptr,
+        d_ptr
+    )
+
+    # Mesure des étapes de chaque image (F3 affiche le panneau)
+    profiler = FrameProfiler.from_environment()
+
     while not pr.window_should_close():
+        profiler.begin_frame()
+        profiler.handle_toggle()
         update_camera_position(camera, movement_speed)
         
         pr.begin_drawing()
         pr.clear_background(pr.RAYWHITE)
         pr.begin_mode_3d(camera)
         
-        axis = Vector3(axis_x_ptr[0], axis_y_ptr[0], axis_z_ptr[0])
-        angle = angle_ptr[0]
-        scale_factor = scale_factor_ptr[0]
-        
-        # Création des matrices de transformation
-        rotation_mat = rotation_matrix_homogeneous(axis, np.radians(angle))
-        scaling_mat = scaling_matrix_homogeneous(axis, scale_factor)
-        
-        # Choix de la projection
-        projection_mat = np.eye(4)
-        if projection_type_ptr[0] > -1 and projection_type_ptr[0] < 1:
-            projection_mat = orthographic_projection_matrix_homogeneous(axis)
-        elif projection_type_ptr[0] == 1:
-            projection_mat = perspective_projection_matrix(d_ptr[0])
+        # Les matrices et les sommets ne sont recalculés que si un curseur a changé
+        if transform_state.update(mesh, profiler):
+            with profiler.scope("envoi GPU"):
+                renderer.update_vertices(mesh.vertices)
+        axis = transform_state.axis
         
         # Dessin des axes et du mesh
+        profiler.begin_scope("dessin")
         draw_coordinate_axes(Vector3(0, 0, 0), scale=3)
         draw_transformation_axis(Vector3(0, 0, 0), axis, scale=3)
 
-        tx = translate_x_ptr[0]
-        ty = translate_y_ptr[0]
-        tz = translate_z_ptr[0]
-        translation_mat = translation_matrix(tx, ty, tz)
-        
-        apply_transformations_homogeneous(mesh, translation_mat, rotation_mat, scaling_mat, projection_mat)
-        
         draw_plane(axis, 10)
-        draw_mesh(mesh)
+        renderer.draw()
         pr.end_mode_3d()
+        profiler.end_scope("dessin")
 
         # GUI de contrôle pour les transformations
+        profiler.begin_scope("gui")
         pr.draw_text("Échelle:", 750, 50, 20, pr.BLACK)
         pr.gui_slider_bar(pr.Rectangle(750, 80, 200, 20), "0.5", "10", scale_factor_ptr, 0.4, 10.0)
         pr.draw_text("Angle (degrés):", 750, 110, 20, pr.BLACK)
@@ -187,9 +378,14 @@ def main():
         if projection_type_ptr[0] == 1:
             pr.draw_text("Distance de projection:", 750, 610, 20, pr.BLACK)
             pr.gui_slider_bar(pr.Rectangle(750, 640, 200, 20), "1.0", "8.0", d_ptr, 1.0, 8.0)
+        profiler.end_scope("gui")
 
+        profiler.draw_overlay()
         pr.end_drawing()
+        profiler.end_frame()
 
+    profiler.dump()
+    renderer.unload()
     pr.close_window()
 
 if __name__ == "__main__":
@@ -7,12 +7,14 @@ from tp3_exo1 import (
     initialize_camera,
     update_camera_position,
     load_ply_file,
-    initialize_mesh_for_transforming,
-    apply_transformations_homogeneous,
-    draw_mesh,
-    rotation_matrix_homogeneous,
+    InstancedMeshRenderer,
+    cached_rotation_matrix,
     translation_matrix
 )
+from culling_functions import cull_instances, mesh_bounding_sphere
+from profiling_functions import FrameProfiler
+from scene_graph_functions import SceneGraph
+from orbit_functions import OrbitSystem
 
 def main():
     pr.init_window(1000, 900, "Cube central tournant avec cubes orbitaux")
@@ -21,7 +23,8 @@ def main():
     # Charger l'objet central
     mesh_file = "cube.ply"  # Remplacez par le chemin réel vers votre fichier PLY
     mesh = load_ply_file(mesh_file)
-    initialize_mesh_for_transforming(mesh)
+    renderer = InstancedMeshRenderer(mesh)
+    bounding_sphere = mesh_bounding_sphere(mesh.vertices)
 
     # Contrôles GUI
     translate_x_ptr = pr.ffi.new('float *', 0.0)
@@ -31,28 +34,27 @@ def main():
     axis_x_ptr = pr.ffi.new('float *', 1.0)
     axis_y_ptr = pr.ffi.new('float *', 0.0)
     axis_z_ptr = pr.ffi.new('float *', 0.0)
-    orbit_count_ptr = pr.ffi.new('float *', 5)
+    # Curseur logarithmique sur log10(nombre + 1) : on choisit aussi finement 3 cubes que 80 000
+    orbit_count_log_ptr = pr.ffi.new('float *', np.log10(5 + 1))
     orbit_radius_ptr = pr.ffi.new('float *', 5)
 
-    # Créer une liste de cubes orbitaux
-    max_orbits = 50
-    orbit_cubes = []
-    for _ in range(max_orbits):
-        orbit_cubes.append({
-            "transform": np.eye(4),  # Matrice de transformation du cube
-            "angle_offset": np.random.uniform(0, 2 * np.pi),  # Décalage angulaire initial (position de départ sur l'orbite)
-            "inclination": np.random.uniform(-np.pi / 4, np.pi / 4),  # Inclinaison de l'orbite par rapport au plan horizontal (± 45°)
-            "rotation_axis": Vector3(  # Axe de rotation propre du cube orbital
-                np.random.uniform(-1, 1),
-                np.random.uniform(-1, 1),
-                np.random.uniform(-1, 1)
-            ),
-            "clockwise": np.random.choice([True, False])  # Sens de rotation : True = horaire, False = antihoraire
-        })
+    # Paramètres des cubes orbitaux, stockés en tableaux contigus
+    max_orbits = 100000
+    orbits = OrbitSystem(max_orbits)
+
+    # Graphe de scène : les cubes orbitaux sont les enfants du cube central
+    scene = SceneGraph(max_orbits + 1)
+    central_node = scene.add_node()
+    orbit_nodes = scene.add_nodes(central_node, max_orbits)
 
     camera = initialize_camera()
 
+    # Mesure des étapes de chaque image (F3 affiche le panneau)
+    profiler = FrameProfiler.from_environment()
+
     while not pr.window_should_close():
+        profiler.begin_frame()
+        profiler.handle_toggle()
         update_camera_position(camera, movement_speed = 0.1)
         pr.begin_drawing()
         pr.clear_background(pr.RAYWHITE)
@@ -60,6 +62,7 @@ def main():
         pr.begin_mode_3d(camera)
 
         # Transformation du cube central
+        profiler.begin_scope("matrices")
         # Construction de la matrice de transformation du cube central (translation + rotation)
         central_translation = translation_matrix(
             translate_x_ptr[0], 
@@ -67,47 +70,38 @@ def main():
             translate_z_ptr[0]
         )
         rotation_axis = Vector3(axis_x_ptr[0], axis_y_ptr[0], axis_z_ptr[0])
-        central_rotation = rotation_matrix_homogeneous(
+        central_rotation = cached_rotation_matrix(
             rotation_axis, 
             np.radians(rotation_angle_ptr[0])
         )
         central_transform = central_translation @ central_rotation
+        scene.set_local(central_node, central_transform)
+
+        # Transformations locales de tous les cubes orbitaux, relatives au cube central, en une passe vectorisée
+        # pr.get_time() retourne le temps écoulé depuis le début du programme en secondes
+        orbit_count = min(round(10 ** orbit_count_log_ptr[0] - 1), max_orbits)
+        orbit_transforms = orbits.local_transforms(pr.get_time(), orbit_radius_ptr[0], orbit_count)
 
+        scene.set_locals(orbit_nodes[:orbit_count], orbit_transforms)
+        profiler.end_scope("matrices")
+        with profiler.scope("graphe de scène"):
+            scene.update()
 
-        # Dessiner le cube central
-        apply_transformations_homogeneous(mesh, central_transform, np.eye(4), np.eye(4), np.eye(4))
-        draw_mesh(mesh)
-
-        # Dessiner les cubes orbitaux
-        for i in range(round(orbit_count_ptr[0])):
-            orbit = orbit_cubes[i]
-            # Calcul de l'angle de rotation en fonction du temps
-            # pr.get_time() retourne le temps écoulé depuis le début du programme en secondes
-            # Multiplié par 1 (sens horaire) ou -1 (sens antihoraire) selon la propriété "clockwise"
-            # angle_offset décale la position initiale de chaque cube pour éviter qu'ils soient tous alignés
-            angle = pr.get_time() * (1 if orbit["clockwise"] else -1) + orbit["angle_offset"]
-
-            # Rotation autour de l'axe du cube
-            orbit_rotation = rotation_matrix_homogeneous(orbit["rotation_axis"], angle)
-
-            # Transformation du cube orbital relative au cube central
-            """ Le mouvement se déroule principalement dans le plan xz, tandis 
-            que la coordonnée y introduit une inclinaison pour donner l'impression 
-            que l'orbite est inclinée dans l'espace 3D."""
-            # Calcul de la position orbitale en coordonnées circulaires
-            orbit_x = np.cos(angle) * orbit_radius_ptr[0]  # Composante X de l'orbite circulaire
-            orbit_y = np.sin(orbit["inclination"]) * orbit_radius_ptr[0]  # Hauteur selon l'inclinaison de l'orbite
-            orbit_z = np.sin(angle) * orbit_radius_ptr[0]  # Composante Z de l'orbite circulaire
-            orbit_translation = translation_matrix(orbit_x, orbit_y, orbit_z)
-            
-            # Combiner les transformations : d'abord rotation propre du cube, puis translation orbitale, puis transformation centrale
-            orbit_transform = central_transform @ orbit_translation @ orbit_rotation
-            apply_transformations_homogeneous(mesh, orbit_transform, np.eye(4), np.eye(4), np.eye(4))
-            draw_mesh(mesh)
+        # Le cube central est la première instance
+        instance_transforms = scene.world[np.concatenate(([central_node], orbit_nodes[:orbit_count]))]
+
+        # Écarter les cubes hors du champ de la caméra puis dessiner les autres en une seule soumission instanciée
+        aspect = pr.get_screen_width() / pr.get_screen_height()
+        with profiler.scope("culling"):
+            visible_transforms, culled_count = cull_instances(instance_transforms, bounding_sphere, camera, aspect)
+        profiler.begin_scope("dessin")
+        renderer.draw(visible_transforms)
 
         pr.end_mode_3d()
+        profiler.end_scope("dessin")
 
         # Contrôles GUI
+        profiler.begin_scope("gui")
         pr.draw_text("Contrôles du Cube Central", 10, 10, 20, pr.BLACK)
         pr.draw_text("Translation X:", 10, 40, 20, pr.BLACK)
         pr.gui_slider_bar(pr.Rectangle(10, 60, 200, 20), "-5.0", "5.0", translate_x_ptr, -5.0, 5.0)
@@ -123,13 +117,20 @@ def main():
         pr.gui_slider_bar(pr.Rectangle(10, 310, 200, 20), "-1.0", "1.0", axis_z_ptr, -1.0, 1.0)
         pr.draw_text("Angle de Rotation:", 10, 340, 20, pr.BLACK)
         pr.gui_slider_bar(pr.Rectangle(10, 360, 200, 20), "0", "360", rotation_angle_ptr, 0.0, 360.0)
-        pr.draw_text("Cubes Orbitaux:", 10, 400, 20, pr.BLACK)
-        pr.gui_slider_bar(pr.Rectangle(10, 420, 200, 20), "0", "50", orbit_count_ptr, 0, max_orbits)
+        pr.draw_text(f"Cubes Orbitaux: {orbit_count}", 10, 400, 20, pr.BLACK)
+        pr.gui_slider_bar(pr.Rectangle(10, 420, 200, 20), "0", str(max_orbits), orbit_count_log_ptr, 0, np.log10(max_orbits + 1))
         pr.draw_text("Rayon d'Orbite:", 10, 440, 20, pr.BLACK)
         pr.gui_slider_bar(pr.Rectangle(10, 460, 200, 20), "0", "10", orbit_radius_ptr, 0, 10)
+        pr.draw_text(f"Cubes hors champ: {culled_count}", 10, 500, 20, pr.DARKGRAY)
+
+        profiler.end_scope("gui")
 
+        profiler.draw_overlay(490, 10)
         pr.end_drawing()
+        profiler.end_frame()
 
+    profiler.dump()
+    renderer.unload()
     pr.close_window()
 
 if __name__ == "__main__":
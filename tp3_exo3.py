@@ -7,12 +7,14 @@ from tp3_exo1 import (
     initialize_camera,
     update_camera_position,
     load_ply_file,
-    initialize_mesh_for_transforming,
-    apply_transformations_homogeneous,
-    draw_mesh,
+    cached_rotation_matrix,
     rotation_matrix_homogeneous,
     translation_matrix
 )
+from culling_functions import cull_instances, mesh_bounding_sphere
+from profiling_functions import FrameProfiler
+from lod_functions import LodRenderer
+from curve_functions import ArcLengthTable, cached_samples, catmull_rom, parametric_curve, spiral, sweep_placements
 
 def uniform_scaling_matrix_homogeneous(k):
     """Génère une matrice homogène de mise à l'échelle uniforme (4x4)."""
@@ -33,6 +35,35 @@ def helix_curve(length, t, spacing, num_turns, scale_factor):
         spacing * np.sin(t) * scale   # Coordonnée z mise à l'échelle
     )
 
+# Courbes proposées dans l'interface, dans l'ordre du sélecteur
+CURVE_NAMES = "Hélice;Spirale;Catmull-Rom"
+
+# Points de passage de la spline de Catmull-Rom (une boucle en huit)
+CATMULL_ROM_POINTS = np.array([
+    [0, 0, 0], [3, 1, 3], [6, 0, 0], [3, -1, -3], [0, 0, 0], [-3, 1, 3], [-6, 0, 0], [-3, -1, -3], [0, 0, 0]
+], dtype=np.float64)
+
+def build_curve(curve_type, length, spacing, num_turns, num_cubes, scale_factor):
+    """Construit la courbe paramétrée sur [0, 1] choisie dans l'interface."""
+    full_range = 2 * np.pi * num_turns
+    if curve_type == 0:
+        # Premier cube à l'indice floor(-num_cubes/2), comme l'échantillonnage d'origine (même pour un nombre impair)
+        t_start = (-num_cubes // 2) / num_cubes * full_range if num_cubes else -full_range / 2
+        return parametric_curve(lambda t: helix_curve(length, t, spacing, num_turns, scale_factor), t_start, t_start + full_range)
+    if curve_type == 1:
+        # La spirale s'étend jusqu'à la demi-hauteur de l'hélice : les deux courbes occupent la même portion de la vue
+        half_height = helix_curve(length, full_range / 2, spacing, num_turns, scale_factor)[1]
+        return spiral(0.5, half_height, num_turns)
+    return catmull_rom(CATMULL_ROM_POINTS)
+
+def curve_sample_table(curve_type, length, spacing, num_turns, num_cubes, scale_factor, aligned):
+    """Retourne les matrices (N,4,4) des cubes répartis à intervalles égaux sur la courbe, recalculées seulement quand un paramètre change."""
+    def build():
+        table = ArcLengthTable(build_curve(curve_type, length, spacing, num_turns, num_cubes, scale_factor))
+        return sweep_placements(table, num_cubes, aligned, endpoint=False)
+
+    return cached_samples("exo3", (curve_type, length, spacing, num_turns, num_cubes, scale_factor, aligned), build)
+
 def main():
     pr.init_window(1000, 900, "Cubes tournants le long d'une hélice")
     pr.set_target_fps(60)
@@ -40,7 +71,9 @@ def main():
     # Charger l'objet central
     mesh_file = "cube.ply"
     mesh = load_ply_file(mesh_file)
-    initialize_mesh_for_transforming(mesh)
+    # Les niveaux de détail sont construits une seule fois au chargement
+    renderer = LodRenderer(mesh)
+    bounding_sphere = mesh_bounding_sphere(mesh.vertices)
 
     # Contrôles GUI
     translate_x_ptr = pr.ffi.new('float *', 0.0)
@@ -55,49 +88,58 @@ def main():
     num_turns_ptr = pr.ffi.new('float *', 5.0)  # Nombre de tours par défaut
     spacing_between_turns_ptr = pr.ffi.new('float *', 10.0)  # Espacement entre les tours
     cubes_per_turn_ptr = pr.ffi.new('float *', 20.0)  # Nombre de cubes par tour
+    align_to_curve_ptr = pr.ffi.new('bool *', False)  # Orienter les cubes selon le repère de Frenet de la courbe
+    curve_type_ptr = pr.ffi.new('int *', 0)  # Courbe choisie parmi CURVE_NAMES
 
     camera = initialize_camera()
 
+    # Mesure des étapes de chaque image (F3 affiche le panneau)
+    profiler = FrameProfiler.from_environment()
+
     while not pr.window_should_close():
+        profiler.begin_frame()
+        profiler.handle_toggle()
         update_camera_position(camera, movement_speed=0.1)
         pr.begin_drawing()
         pr.clear_background(pr.RAYWHITE)
 
         pr.begin_mode_3d(camera)
         
-        # Calculer le centre de l'hélice et appliquer la transformation centrale
-        num_turns = num_turns_ptr[0]
-        spacing = spacing_between_turns_ptr[0]
-
         # Transformation du cube central
+        profiler.begin_scope("matrices")
         central_translation = translation_matrix(translate_x_ptr[0], translate_y_ptr[0], translate_z_ptr[0])
         rotation_axis = Vector3(axis_x_ptr[0], axis_y_ptr[0], axis_z_ptr[0])
-        central_rotation = rotation_matrix_homogeneous(rotation_axis, np.radians(rotation_angle_ptr[0]))
+        central_rotation = cached_rotation_matrix(rotation_axis, np.radians(rotation_angle_ptr[0]))
         central_transform = central_translation @ central_rotation
 
-        # Dessiner les cubes le long de l'hélice
+        # Dessiner les cubes le long de la courbe
         num_turns = num_turns_ptr[0]
         num_cubes = int(num_turns * cubes_per_turn_ptr[0])
         scale_factor = 50.0
         spacing = spacing_between_turns_ptr[0]  # Récupérer la valeur dynamique de l'espacement
-        for i in range(-num_cubes // 2, num_cubes // 2):
-            t = i * (2 * np.pi * num_turns / num_cubes)
-            x, y, z = helix_curve(curve_length, t, spacing, num_turns, scale_factor)
-            cube_translation = translation_matrix(x, y, z)
+        cube_placements = curve_sample_table(curve_type_ptr[0], curve_length, spacing, num_turns, num_cubes, scale_factor, align_to_curve_ptr[0])
+
+        # Rotation et mise à l'échelle, identiques pour tous les cubes
+        time_angle = pr.get_time()
+        cube_rotation = rotation_matrix_homogeneous(Vector3(0, 1, 0), time_angle)
+        cube_scaling = uniform_scaling_matrix_homogeneous(cube_scale_ptr[0])
 
-            # Rotation et mise à l'échelle
-            time_angle = pr.get_time()
-            cube_rotation = rotation_matrix_homogeneous(Vector3(0, 1, 0), time_angle)
-            cube_scaling = uniform_scaling_matrix_homogeneous(cube_scale_ptr[0])
+        # Combiner les transformations de tous les cubes en un seul produit diffusé
+        instance_transforms = central_transform @ cube_placements @ (cube_rotation @ cube_scaling)
+        profiler.end_scope("matrices")
 
-            # Combiner les transformations
-            cube_transform = central_transform @ cube_translation @ cube_rotation @ cube_scaling
-            apply_transformations_homogeneous(mesh, cube_transform, np.eye(4), np.eye(4), np.eye(4))
-            draw_mesh(mesh)
+        # Écarter les cubes hors du champ de la caméra puis dessiner les autres en une seule soumission instanciée
+        aspect = pr.get_screen_width() / pr.get_screen_height()
+        with profiler.scope("culling"):
+            visible_transforms, culled_count = cull_instances(instance_transforms, bounding_sphere, camera, aspect)
+        profiler.begin_scope("dessin")
+        renderer.draw(visible_transforms, camera, pr.get_screen_height())
 
         pr.end_mode_3d()
+        profiler.end_scope("dessin")
 
         # Contrôles GUI
+        profiler.begin_scope("gui")
         pr.draw_text("Translation X:", 10, 40, 20, pr.BLACK)
         pr.gui_slider_bar(pr.Rectangle(10, 60, 200, 20), "-5.0", "5.0", translate_x_ptr, -5.0, 5.0)
         pr.draw_text("Translation Y:", 10, 90, 20, pr.BLACK)
@@ -112,15 +154,24 @@ def main():
         pr.gui_slider_bar(pr.Rectangle(10, 310, 200, 20), "-1.0", "1.0", axis_z_ptr, -1.0, 1.0)
         pr.draw_text("Angle de Rotation:", 10, 340, 20, pr.BLACK)
         pr.gui_slider_bar(pr.Rectangle(10, 360, 200, 20), "0", "360", rotation_angle_ptr, 0.0, 360.0)        
+        pr.gui_toggle_group(pr.Rectangle(10, 390, 90, 20), CURVE_NAMES, curve_type_ptr)
+        pr.gui_check_box(pr.Rectangle(10, 420, 20, 20), "Aligner sur la courbe", align_to_curve_ptr)
         pr.draw_text("Taille des Cubes:", 10, 460, 20, pr.BLACK)
         pr.gui_slider_bar(pr.Rectangle(10, 480, 200, 20), "0.1", "3.0", cube_scale_ptr, 0.01, 1.0)
         pr.draw_text("Écartement des Tours:", 10, 520, 20, pr.BLACK)
         pr.gui_slider_bar(pr.Rectangle(10, 540, 200, 20), "0.5", "5.0", spacing_between_turns_ptr, 0.5, 15.0)
         pr.draw_text("Nombre de cubes par Tour:", 10, 590, 20, pr.BLACK)
         pr.gui_slider_bar(pr.Rectangle(10, 610, 200, 20), "1", "30", cubes_per_turn_ptr, 1, 30)
+        pr.draw_text(f"Cubes hors champ: {culled_count}", 10, 650, 20, pr.DARKGRAY)
+
+        profiler.end_scope("gui")
 
+        profiler.draw_overlay(490, 10)
         pr.end_drawing()
+        profiler.end_frame()
 
+    profiler.dump()
+    renderer.unload()
     pr.close_window()
 
 if __name__ == "__main__":